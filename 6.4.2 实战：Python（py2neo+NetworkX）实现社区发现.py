@@ -1,17 +1,22 @@
+import time
+
 from py2neo import Graph, Node, Relationship
 import networkx as nx
 import community as community_louvain  # python-louvain库
 import matplotlib.pyplot as plt
 
+from GraphSnapshot import GraphSnapshot
+
 # ---------------------- 1. 连接Neo4j并写入电商用户数据 ----------------------
 graph = Graph("bolt://localhost:7687", user="neo4j", password="123456")
 
 # 清空现有数据
 graph.run("MATCH (n:User) DETACH DELETE n")
 
-# 创建用户节点
+# 创建用户节点（updated_at为毫秒时间戳，与Cypher的timestamp()一致，6.6.2的图快照缓存据此判断数据是否变化）
+updated_at = int(time.time() * 1000)
 users = ["U1", "U2", "U3", "U4", "U5", "U6", "U7", "U8"]
-nodes = {user: Node("User", id=user) for user in users}
+nodes = {user: Node("User", id=user, updated_at=updated_at) for user in users}
 for node in nodes.values():
     graph.create(node)
 
@@ -22,24 +27,20 @@ edges = [
     ("U6", "U4", 4), ("U7", "U8", 3), ("U7", "U1", 1), ("U8", "U2", 1)
 ]
 for start, end, count in edges:
-    rel = Relationship(nodes[start], "CO_BUY", nodes[end], count=count)
+    rel = Relationship(nodes[start], "CO_BUY", nodes[end], count=count, updated_at=updated_at)
     graph.create(rel)
     # 无向边：反向创建
-    rel_rev = Relationship(nodes[end], "CO_BUY", nodes[start], count=count)
+    rel_rev = Relationship(nodes[end], "CO_BUY", nodes[start], count=count, updated_at=updated_at)
     graph.create(rel_rev)
 
 # ---------------------- 2. 从Neo4j读取数据构建图 ----------------------
 def build_user_graph():
-    G = nx.Graph()
-    # 读取节点
-    nodes_result = graph.run("MATCH (n:User) RETURN n.id AS id").data()
-    for node in nodes_result:
-        G.add_node(node["id"])
-    # 读取带权边
-    edges_result = graph.run("MATCH (a:User)-[r:CO_BUY]->(b:User) RETURN a.id AS start, b.id AS end, r.count AS count").data()
-    for edge in edges_result:
-        G.add_weighted_edges_from([(edge["start"], edge["end"], edge["count"])])
-    return G
+    # 优化前：.data() 读成字典列表，再逐条 add_weighted_edges_from
+    # 优化后：节点与带权边（共同购买次数）流式读入CSR快照，执行NetworkX算法前再转换
+    snapshot = GraphSnapshot.from_neo4j(
+        graph, "MATCH (a:User)-[r:CO_BUY]->(b:User) RETURN a.id AS start, b.id AS end, r.count AS count",
+        node_queries=[("MATCH (n:User) RETURN n.id AS id", {})])
+    return snapshot.to_networkx()
 
 G = build_user_graph()
 
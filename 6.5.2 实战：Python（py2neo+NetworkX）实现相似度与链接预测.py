@@ -3,6 +3,8 @@ import networkx as nx
 import matplotlib.pyplot as plt
 from networkx.algorithms import similarity, link_prediction
 
+from GraphSnapshot import GraphSnapshot
+
 # ---------------------- 1. 连接Neo4j并写入用户-电影数据 ----------------------
 graph = Graph("bolt://localhost:7687", user="neo4j", password="123456")
 
@@ -36,17 +38,13 @@ for start, end in edges:
 
 # ---------------------- 2. 从Neo4j读取数据构建二分图 ----------------------
 def build_bipartite_graph():
-    G = nx.Graph()  # 修改这里：使用 nx.Graph() 而不是 nx.bipartite.Graph()
-    # 读取用户和电影节点，标注分区（0：用户，1：电影）
-    users_result = graph.run("MATCH (n:User) RETURN n.id AS id").data()
-    movies_result = graph.run("MATCH (n:Movie) RETURN n.name AS name").data()
-    G.add_nodes_from([user["id"] for user in users_result], bipartite=0)
-    G.add_nodes_from([movie["name"] for movie in movies_result], bipartite=1)
-    # 读取观影关系
-    edges_result = graph.run("MATCH (a:User)-[r:WATCHED]->(b:Movie) RETURN a.id AS user, b.name AS movie").data()
-    for edge in edges_result:
-        G.add_edge(edge["user"], edge["movie"])
-    return G
+    # 优化前：.data() 读成字典列表，再逐个 add_node / add_edge
+    # 优化后：用户、电影节点（标注分区 0：用户，1：电影）与观影关系流式读入CSR快照，执行NetworkX算法前再转换为nx.Graph
+    snapshot = GraphSnapshot.from_neo4j(
+        graph, "MATCH (a:User)-[r:WATCHED]->(b:Movie) RETURN a.id AS user, b.name AS movie",
+        node_queries=[("MATCH (n:User) RETURN n.id AS id", {"bipartite": 0}),
+                      ("MATCH (n:Movie) RETURN n.name AS name", {"bipartite": 1})])
+    return snapshot.to_networkx()
 
 G = build_bipartite_graph()
 
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 # 文件名：user_community_analysis.py
 from py2neo import Graph
-import networkx as nx
 import community as community_louvain
 
+from GraphSnapshot import load_cached
+
+SNAPSHOT_PATH = "./snapshots/user_co_buy"  # 图快照缓存目录，None 时每次全量读取
+
 
 def full_analysis_pipeline():
     # 1. 连接Neo4j
@@ -11,36 +14,30 @@ def full_analysis_pipeline():
 
     # 2. 构建图
     def build_graph():
-        G = nx.Graph()
-        # 读取节点数据（批量）
-        nodes_df = graph.run("MATCH (n:User) RETURN n.id AS id").to_data_frame()
-
-        # 验证节点数据
-        if nodes_df.empty or 'id' not in nodes_df.columns:
-            print("警告：没有找到用户节点数据")
-            return G
-
-        # 添加节点
-        valid_nodes = nodes_df['id'].dropna().tolist()  # 过滤None值
-        G.add_nodes_from(valid_nodes)
-
-        # 读取边数据（批量）
-        edges_df = graph.run(
-            "MATCH (a:User)-[r:CO_BUY]->(b:User) RETURN a.id AS start, b.id AS end, r.count AS count").to_data_frame()
-
-        # 验证边数据
-        if not edges_df.empty and all(col in edges_df.columns for col in ['start', 'end', 'count']):
-            # 过滤None值的边
-            edges_df = edges_df.dropna(subset=['start', 'end', 'count'])
-            edges = edges_df[["start", "end", "count"]].values.tolist()
-            # 过滤包含None的边
-            valid_edges = [(start, end, count) for start, end, count in edges
-                           if start is not None and end is not None and count is not None]
-            G.add_weighted_edges_from(valid_edges)
-        else:
-            print("警告：没有找到边数据或列名不匹配")
-
-        return G
+        # 优化前：每次运行都全量读取User节点与CO_BUY关系，逐条加入NetworkX图
+        # 优化后：图快照缓存在磁盘上，数据库指纹（节点数、关系数、权重之和、最大updated_at）不变时直接内存映射加载，
+        # 少量关系变化时只读取updated_at更新过的节点与关系；写入方新增/修改时需设置 updated_at = timestamp()
+        # （如6.4.2），没有updated_at时每次全量读取
+        snapshot, status = load_cached(
+            SNAPSHOT_PATH, graph,
+            "MATCH (a:User)-[r:CO_BUY]->(b:User) RETURN a.id AS start, b.id AS end, r.count AS count",
+            node_queries=[("MATCH (n:User) RETURN n.id AS id", {})],
+            fingerprint_query="""
+                MATCH (n:User) WITH count(n) AS nodes, max(n.updated_at) AS node_updated
+                OPTIONAL MATCH (:User)-[r:CO_BUY]->(:User)
+                WITH nodes, node_updated, count(r) AS edges, sum(r.count) AS weight_sum,
+                     max(r.updated_at) AS edge_updated
+                RETURN nodes, edges, weight_sum,
+                       CASE WHEN edge_updated IS NULL OR node_updated > edge_updated
+                            THEN node_updated ELSE edge_updated END AS updated
+            """,
+            delta_edge_query="""
+                MATCH (a:User)-[r:CO_BUY]->(b:User) WHERE r.updated_at >= $since
+                RETURN a.id AS start, b.id AS end, r.count AS count
+            """,
+            delta_node_queries=[("MATCH (n:User) WHERE n.updated_at >= $since RETURN n.id AS id", {})])
+        print(f"图快照（{status}）：{snapshot.number_of_nodes()}个节点，{snapshot.number_of_edges()}条边")
+        return snapshot.to_networkx()
 
     G = build_graph()
 
@@ -3,6 +3,10 @@ import networkx as nx
 import community as community_louvain
 import json
 
+from GraphSnapshot import load_cached
+
+SNAPSHOT_PATH = "./snapshots/user_buy_item"  # 图快照缓存目录，None 时每次全量读取
+
 
 def create_sample_data():
     """创建样例数据，确保用户之间有共同购买的商品"""
@@ -20,7 +24,7 @@ def create_sample_data():
         {"id": "U10090", "name": "用户5"},
     ]
     for user in users_data:
-        graph.run("CREATE (u:User {id: $id, name: $name})", id=user["id"], name=user["name"])
+        graph.run("CREATE (u:User {id: $id, name: $name, updated_at: timestamp()})", id=user["id"], name=user["name"])
 
     # 创建商品节点
     items_data = [
@@ -33,7 +37,7 @@ def create_sample_data():
         {"id": "I007", "name": "商品7", "category": "服装"},  # 新增商品
     ]
     for item in items_data:
-        graph.run("CREATE (i:Item {id: $id, name: $name, category: $category})",
+        graph.run("CREATE (i:Item {id: $id, name: $name, category: $category, updated_at: timestamp()})",
                   id=item["id"], name=item["name"], category=item["category"])
 
     # 创建购买关系 - 优化数据结构，确保有推荐候选
@@ -68,49 +72,48 @@ def create_sample_data():
     for relation in buy_relations:
         graph.run("""
         MATCH (u:User {id: $user_id}), (i:Item {id: $item_id})
-        CREATE (u)-[:BUY {amount: $amount}]->(i)
+        CREATE (u)-[:BUY {amount: $amount, updated_at: timestamp()}]->(i)
         """, user_id=relation["user_id"], item_id=relation["item_id"], amount=relation["amount"])
 
     print(f"成功创建{len(users_data)}个用户，{len(items_data)}个商品，{len(buy_relations)}个购买关系")
 
 
-def user_recommendation_pipeline(user_id="U10086"):
-    # 首先创建样例数据
-    create_sample_data()
+def user_recommendation_pipeline(user_id="U10086", create_data=True):
+    # 首先创建样例数据（重建数据后图快照缓存会全量刷新，已有数据时传 create_data=False）
+    if create_data:
+        create_sample_data()
 
     # 1. 连接Neo4j
     graph = Graph("bolt://localhost:7687", user="neo4j", password="123456")
 
     # 2. 构建业务图（用户-商品-订单）
     def build_business_graph():
-        G = nx.Graph()
-        # 读取用户节点
-        users_df = graph.run("MATCH (n:User) RETURN n.id AS id").to_data_frame()
-        if not users_df.empty and 'id' in users_df.columns:
-            G.add_nodes_from(users_df["id"].dropna().tolist(), type="user")
-
-        # 读取商品节点
-        items_df = graph.run("MATCH (n:Item) RETURN n.id AS id, n.category AS category").to_data_frame()
-        if not items_df.empty and all(col in items_df.columns for col in ['id', 'category']):
-            for _, row in items_df.iterrows():
-                if row["id"] is not None and row["category"] is not None:
-                    G.add_node(row["id"], type="item", category=row["category"])
-
-        # 读取购买关系
-        buy_edges_df = graph.run("""
+        # 优化前：读成DataFrame后逐行 add_node，边再转成列表加入NetworkX图
+        # 优化后：用户、商品节点（带type/category属性）与购买关系流式读入CSR快照（跳过含None的行），
+        #         执行NetworkX算法前再转换；快照缓存在磁盘上，数据库指纹不变时直接内存映射加载，
+        #         少量购买关系变化时只读取updated_at更新过的节点与关系
+        snapshot, status = load_cached(SNAPSHOT_PATH, graph, """
         MATCH (u:User)-[r:BUY]->(i:Item)
         RETURN u.id AS user, i.id AS item, r.amount AS amount
-        """).to_data_frame()
-
-        # 验证边数据并添加到图中
-        if not buy_edges_df.empty and all(col in buy_edges_df.columns for col in ['user', 'item', 'amount']):
-            # 过滤掉 None 值
-            valid_edges_df = buy_edges_df.dropna(subset=['user', 'item', 'amount'])
-            if not valid_edges_df.empty:
-                edges = valid_edges_df[["user", "item", "amount"]].values.tolist()
-                G.add_weighted_edges_from(edges)
-
-        return G
+        """, node_queries=[("MATCH (n:User) RETURN n.id AS id", {"type": "user"}),
+                           ("MATCH (n:Item) RETURN n.id AS id, n.category AS category", {"type": "item"})],
+            fingerprint_query="""
+        MATCH (n) WHERE n:User OR n:Item
+        WITH count(n) AS nodes, max(n.updated_at) AS node_updated
+        OPTIONAL MATCH (:User)-[r:BUY]->(:Item)
+        WITH nodes, node_updated, count(r) AS edges, sum(r.amount) AS weight_sum, max(r.updated_at) AS edge_updated
+        RETURN nodes, edges, weight_sum,
+               CASE WHEN edge_updated IS NULL OR node_updated > edge_updated
+                    THEN node_updated ELSE edge_updated END AS updated
+        """, delta_edge_query="""
+        MATCH (u:User)-[r:BUY]->(i:Item) WHERE r.updated_at >= $since
+        RETURN u.id AS user, i.id AS item, r.amount AS amount
+        """, delta_node_queries=[
+                ("MATCH (n:User) WHERE n.updated_at >= $since RETURN n.id AS id", {"type": "user"}),
+                ("MATCH (n:Item) WHERE n.updated_at >= $since RETURN n.id AS id, n.category AS category",
+                 {"type": "item"})])
+        print(f"图快照（{status}）：{snapshot.number_of_nodes()}个节点，{snapshot.number_of_edges()}条边")
+        return snapshot.to_networkx()
 
     G = build_business_graph()
 
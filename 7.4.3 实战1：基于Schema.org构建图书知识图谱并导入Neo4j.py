@@ -2,6 +2,8 @@ from neo4j import GraphDatabase
 from rdflib import Graph, Namespace, Literal
 from rdflib.namespace import XSD  # 移除SCHEMA导入
 
+from Neo4jSchemaManager import Neo4jSchemaManager
+
 # 手动定义Schema.org命名空间
 SCHEMA = Namespace("http://schema.org/")
 
@@ -56,7 +58,8 @@ def schema_to_neo4j(tx, subj, pred, obj):
         """, subj_id=subj_id, pred_name=pred_name, obj_value=str(obj))
 
 
-# 4. 导入Neo4j
+# 4. 导入Neo4j（先为即将MERGE的 (类型, id) 建立唯一约束）
+Neo4jSchemaManager(driver).ensure({(o.split("/")[-1], "id") for o in g.objects(None, SCHEMA.type)})
 with driver.session() as session:
     for s, p, o in g:
         session.execute_write(schema_to_neo4j, s, p, o)
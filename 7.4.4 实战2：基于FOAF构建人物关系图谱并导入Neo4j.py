@@ -2,6 +2,8 @@ from neo4j import GraphDatabase
 from rdflib import Graph, Namespace, Literal
 from rdflib.namespace import FOAF, XSD, RDF  # 添加RDF导入
 
+from Neo4jSchemaManager import Neo4jSchemaManager
+
 # 1. 连接Neo4j
 driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "123456"))
 
@@ -61,7 +63,8 @@ def foaf_to_neo4j(tx, subj, pred, obj):
             SET n.{pred_name} = $obj_value
         """, subj_id=subj_id, pred_name=pred_name, obj_value=str(obj))
 
-# 4. 导入Neo4j
+# 4. 导入Neo4j（先为 Person.id 建立唯一约束）
+Neo4jSchemaManager(driver).ensure([("Person", "id")])
 with driver.session() as session:
     for s, p, o in g:
         session.execute_write(foaf_to_neo4j, s, p, o)
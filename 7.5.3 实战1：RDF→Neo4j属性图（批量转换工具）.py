@@ -1,74 +1,94 @@
 from neo4j import GraphDatabase
-from rdflib import Graph, URIRef, Literal
+from rdflib import Graph
 from rdflib.namespace import RDF
 
+from BulkImportExporter import BulkImportCsvExporter
+from Neo4jSchemaManager import Neo4jSchemaManager
+from RDFBatchLoader import RDFBatchLoader, clean_name
+from RDFStream import DiskTypeStore, build_type_map, iter_chunks, iter_triples
+
 
 class RDF2Neo4jConverter:
     def __init__(self, neo4j_uri, neo4j_user, neo4j_password):
         self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
+        self.schema = Neo4jSchemaManager(self.driver)  # MERGE {id} 前自动建立唯一约束
 
     def close(self):
         self.driver.close()
 
-    def _get_node_label(self, uri, rdf_graph):
-        """从RDF中提取节点的类型作为Neo4j Label"""
-        types = [t for t in rdf_graph.objects(URIRef(uri), RDF.type)]
-        return types[0].split("/")[-1] if types else "Resource"
-
-    def _clean_name(self, uri):
-        """清理URI名称，确保符合Neo4j命名规范"""
-        # 提取最后部分
-        name = uri.split("/")[-1].split("#")[-1]
-        # 移除特殊字符，只保留字母、数字和下划线
-        import re
-        cleaned = re.sub(r'[^a-zA-Z0-9_]', '_', name)
-        # 如果以数字开头，添加前缀
-        if cleaned and cleaned[0].isdigit():
-            cleaned = f"rel_{cleaned}"
-        return cleaned or "RELATIONSHIP"  # 默认名称
-
-    def convert(self, rdf_file, rdf_format="turtle"):
+    def _build_index(self, rdf_graph):
+        """单次遍历RDF图，预先建立 节点→Label 与 谓词→清理后名称 两个索引"""
+        labels = {}
+        predicate_names = {}
+        for s, p, o in rdf_graph:
+            if p not in predicate_names:
+                predicate_names[p] = clean_name(p)
+            # 多个类型时取第一个
+            if p == RDF.type and s not in labels:
+                labels[s] = o.split("/")[-1]
+        return labels, predicate_names
+
+    def convert(self, rdf_file, rdf_format="turtle", batch_size=5000):
         """将RDF文件转换为Neo4j属性图"""
         # 读取RDF文件
         g = Graph()
         g.parse(rdf_file, format=rdf_format)
 
-        with self.driver.session() as session:
-            # 1. 创建所有节点
-            nodes = set([s for s, p, o in g] + [o for s, p, o in g if isinstance(o, URIRef)])
-            for node in nodes:
-                if isinstance(node, URIRef):
-                    label = self._get_node_label(node, g)
-                    node_id = node.split("/")[-1]
-                    session.run(f"""
-                        MERGE (n:{label} {{id: $node_id}})
-                        SET n.uri = $node_uri
-                    """, node_id=node_id, node_uri=str(node))
-
-            # 2. 创建关系和属性
-            for s, p, o in g:
-                s_id = s.split("/")[-1]
-                s_label = self._get_node_label(s, g)
-                p_name = self._clean_name(str(p))  # 使用清理后的名称
-
-                if isinstance(o, URIRef):
-                    # 客体是节点，创建关系
-                    o_id = o.split("/")[-1]
-                    o_label = self._get_node_label(o, g)
-                    session.run(f"""
-                        MATCH (n:{s_label} {{id: $s_id}}), (m:{o_label} {{id: $o_id}})
-                        MERGE (n)-[r:{p_name}]->(m)
-                        SET r.uri = $p_uri
-                    """, s_id=s_id, o_id=o_id, p_name=p_name, p_uri=str(p))
-                elif isinstance(o, Literal):
-                    # 客体是字面量，设置属性
-                    p_name = self._clean_name(str(p))  # 使用清理后的名称
-                    session.run(f"""
-                        MATCH (n:{s_label} {{id: $s_id}})
-                        SET n.{p_name} = $o_value
-                    """, s_id=s_id, p_name=p_name, o_value=str(o))
+        # 写入前一次性建立Label/谓词索引，节点与关系阶段直接查表，不再逐条查询rdf:type
+        labels, predicate_names = self._build_index(g)
+        print(f"索引构建完成：{len(labels)}个带类型节点，{len(predicate_names)}种谓词")
+
+        # 节点、关系、属性按(主体Label, 谓词, 客体Label)分组，以UNWIND批量写入
+        loader = RDFBatchLoader(self.driver, batch_size=batch_size, schema=self.schema)
+        stats = loader.load(g, lambda uri: labels.get(uri, "Resource"), predicate_names)
 
         print(f"成功将RDF文件 {rdf_file} 转换为Neo4j属性图")
+        return stats
+
+    def convert_parallel(self, rdf_file, rdf_format="turtle", workers=4, batch_size=5000):
+        """并行将RDF文件转换为Neo4j属性图，workers为并发session数"""
+        g = Graph()
+        g.parse(rdf_file, format=rdf_format)
+
+        labels, predicate_names = self._build_index(g)
+        loader = RDFBatchLoader(self.driver, batch_size=batch_size, schema=self.schema)
+        stats = loader.load_parallel(g, lambda uri: labels.get(uri, "Resource"),
+                                     workers=workers, predicate_names=predicate_names)
+
+        print(f"成功将RDF文件 {rdf_file} 并行转换为Neo4j属性图")
+        return stats
+
+    def convert_stream(self, nt_file, batch_size=5000, chunk_size=100000, type_store_path=None):
+        """流式导入N-Triples/N-Quads文件（支持.gz），不构建rdflib Graph，内存占用与文件大小无关
+
+        第一遍只收集rdf:type得到 节点→Label 映射（指定type_store_path时落盘到SQLite），
+        第二遍按chunk_size分块读取三元组，直接交给UNWIND批量写入。
+        """
+        store = DiskTypeStore(type_store_path) if type_store_path else None
+        try:
+            labels = build_type_map(nt_file, lambda t: t.split("/")[-1], store)
+            print(f"类型索引构建完成：{len(labels)}个带类型节点")
+
+            loader = RDFBatchLoader(self.driver, batch_size=batch_size, schema=self.schema)
+            stats = loader.load_chunks(iter_chunks(iter_triples(nt_file), chunk_size),
+                                       lambda uri: labels.get(uri, "Resource"))
+        finally:
+            if store is not None:
+                store.close()
+
+        print(f"成功将RDF文件 {nt_file} 流式转换为Neo4j属性图")
+        return stats
+
+    def export_bulk_csv(self, nt_file, output_dir, type_store_path=None):
+        """新库首次全量加载：流式将N-Triples/N-Quads转换为 neo4j-admin database import 的CSV文件"""
+        store = DiskTypeStore(type_store_path) if type_store_path else None
+        try:
+            labels = build_type_map(nt_file, lambda t: t.split("/")[-1], store)
+            exporter = BulkImportCsvExporter(output_dir)
+            return exporter.export_rdf(iter_triples(nt_file), lambda uri: labels.get(uri, "Resource"))
+        finally:
+            if store is not None:
+                store.close()
 
 # 工具使用示例
 if __name__ == "__main__":
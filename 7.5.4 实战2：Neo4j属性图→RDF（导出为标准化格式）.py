@@ -1,18 +1,60 @@
+import datetime
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 from neo4j import GraphDatabase
+from neo4j.time import Date, DateTime, Duration, Time
 from rdflib import Graph, URIRef, Literal, Namespace
 from rdflib.namespace import RDF, XSD
 
+from RDFStream import format_iri, format_literal, open_text
+
 
 class Neo4j2RDFConverter:
     def __init__(self, neo4j_uri, neo4j_user, neo4j_password):
         self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
         self.EX = Namespace("http://example.org/neo4j2rdf/")  # 自定义命名空间
+        self._conn_args = (neo4j_uri, neo4j_user, neo4j_password)  # 分片导出时每个子进程各自建立连接
 
     def close(self):
         self.driver.close()
 
+    def _node_uri(self, label, node_id):
+        """节点URI：命名空间/label小写/id"""
+        return self.EX[f"{(label or 'Resource').lower()}/{node_id}"]
+
+    @staticmethod
+    def _to_literals(value):
+        """属性值 → [(词法形式, XSD数据类型), ...]；列表展开为多个值，无法表示的类型返回空列表"""
+        # bool 是 int 的子类，必须先判断
+        if isinstance(value, bool):
+            return [("true" if value else "false", XSD.boolean)]
+        if isinstance(value, int):
+            return [(str(value), XSD.int if -2 ** 31 <= value < 2 ** 31 else XSD.long)]
+        if isinstance(value, float):
+            if value != value or value in (float("inf"), float("-inf")):
+                return [({"inf": "INF", "-inf": "-INF"}.get(repr(value), "NaN"), XSD.double)]
+            return [(repr(value), XSD.double)]
+        if isinstance(value, str):
+            return [(value, XSD.string)]
+        # 时间类型：Neo4j时间类型与Python datetime（Duration 是 tuple 子类，须在列表之前判断）
+        if isinstance(value, (DateTime, datetime.datetime)):
+            return [(value.isoformat(), XSD.dateTime)]
+        if isinstance(value, (Date, datetime.date)):
+            return [(value.isoformat(), XSD.date)]
+        if isinstance(value, (Time, datetime.time)):
+            return [(value.isoformat(), XSD.time)]
+        if isinstance(value, Duration):
+            return [(value.iso_format(), XSD.duration)]
+        if isinstance(value, (list, tuple)):
+            return [lit for item in value for lit in Neo4j2RDFConverter._to_literals(item)]
+        return []
+
     def convert(self, output_file, rdf_format="turtle"):
-        """将Neo4j属性图导出为RDF"""
+        """将Neo4j属性图导出为RDF（构建完整rdflib Graph，适合小规模数据）"""
         g = Graph()
 
         with self.driver.session() as session:
@@ -27,7 +69,7 @@ class Neo4j2RDFConverter:
                 props = record["props"]
 
                 # 定义节点URI
-                node_uri = self.EX[f"{label.lower()}/{node_id}"]
+                node_uri = self._node_uri(label, node_id)
                 # 声明节点类型
                 g.add((node_uri, RDF.type, URIRef(f"{self.EX}{label}")))
 
@@ -36,30 +78,172 @@ class Neo4j2RDFConverter:
                     if prop_name not in ["id", "uri"]:
                         prop_uri = self.EX[prop_name]
                         # 处理数据类型
-                        if isinstance(prop_value, int):
-                            g.add((node_uri, prop_uri, Literal(prop_value, datatype=XSD.int)))
-                        elif isinstance(prop_value, str):
-                            g.add((node_uri, prop_uri, Literal(prop_value, datatype=XSD.string)))
-
-                # 2. 提取所有关系
-                rel_result = session.run("""
-                    MATCH (n)-[r]->(m)
-                    RETURN labels(n)[0] AS n_label, n.id AS n_id,
-                           type(r) AS rel_type,
-                           labels(m)[0] AS m_label, m.id AS m_id
-                """)
-                for rel_record in rel_result:
-                    n_uri = self.EX[f"{rel_record['n_label'].lower()}/{rel_record['n_id']}"]
-                    m_uri = self.EX[f"{rel_record['m_label'].lower()}/{rel_record['m_id']}"]
-                    rel_uri = self.EX[rel_record['rel_type']]
-
-                    # 添加关系三元组
-                    g.add((n_uri, rel_uri, m_uri))
+                        for lexical, datatype in self._to_literals(prop_value):
+                            g.add((node_uri, prop_uri, Literal(lexical, datatype=datatype)))
+
+            # 2. 提取所有关系（在节点循环之外只查询一次）
+            rel_result = session.run("""
+                MATCH (n)-[r]->(m)
+                RETURN labels(n)[0] AS n_label, n.id AS n_id,
+                       type(r) AS rel_type,
+                       labels(m)[0] AS m_label, m.id AS m_id
+            """)
+            for rel_record in rel_result:
+                n_uri = self._node_uri(rel_record['n_label'], rel_record['n_id'])
+                m_uri = self._node_uri(rel_record['m_label'], rel_record['m_id'])
+                rel_uri = self.EX[rel_record['rel_type']]
+
+                # 添加关系三元组
+                g.add((n_uri, rel_uri, m_uri))
 
         # 序列化RDF文件
         g.serialize(destination=output_file, format=rdf_format)
         print(f"成功将Neo4j属性图导出为RDF文件 {output_file}")
 
+    def _write_node(self, f, record, rdf_format):
+        """写出一个节点的类型与属性三元组，返回写出的三元组数"""
+        label = record["label"] or "Resource"
+        node_id = record["id"] if record["id"] is not None else record["_id"]
+        statements = [(format_iri(RDF.type), format_iri(f"{self.EX}{label}"))]
+        for prop_name, prop_value in record["props"].items():
+            if prop_name in ("id", "uri"):
+                continue
+            pred = format_iri(self.EX[prop_name])
+            for lexical, datatype in self._to_literals(prop_value):
+                statements.append((pred, format_literal(lexical, datatype)))
+
+        subject = format_iri(self._node_uri(label, node_id))
+        if rdf_format == "turtle":
+            # Turtle：同一主体的多个谓词用 ; 连接
+            body = " ;\n    ".join(f"{p} {o}" for p, o in statements)
+            f.write(f"{subject} {body} .\n")
+        else:
+            f.writelines(f"{subject} {p} {o} .\n" for p, o in statements)
+        return len(statements)
+
+    def _write_relationship(self, f, record):
+        """写出一条关系三元组（N-Triples单行写法同时也是合法的Turtle）"""
+        n_id = record["n_id"] if record["n_id"] is not None else record["n_internal"]
+        m_id = record["m_id"] if record["m_id"] is not None else record["m_internal"]
+        f.write(f"{format_iri(self._node_uri(record['n_label'], n_id))} "
+                f"{format_iri(self.EX[record['rel_type']])} "
+                f"{format_iri(self._node_uri(record['m_label'], m_id))} .\n")
+        return 1
+
+    def _export_query(self, session, query, write_record, params=None):
+        """单个查询流式读取：驱动按session的fetch_size分批向服务端拉取记录，边读边写，内存中只保留一批
+
+        不按 id(n) > $last_id 分页：内部id没有范围索引，每页都要全量扫描后取top-k，总开销随页数平方增长。
+        """
+        total = 0
+        for record in session.run(query, **(params or {})):
+            total += write_record(record)
+        return total
+
+    def export_stream(self, output_file, rdf_format="nt", page_size=10000,
+                      node_pattern="(n)", node_filter="true", params=None):
+        """流式导出为N-Triples（nt）或Turtle（turtle），节点与关系各一个查询、每批page_size条流式读取，边读边写，
+        不构建rdflib Graph；输出文件以.gz结尾时自动gzip压缩。
+        node_pattern/node_filter 限定导出的节点范围，关系随其起点节点一起导出"""
+        start = time.perf_counter()
+        with open_text(output_file, "wt") as f, self.driver.session(fetch_size=page_size) as session:
+            if rdf_format == "turtle":
+                f.write(f"# Neo4j属性图导出，命名空间 {self.EX}\n")
+
+            # 1. 流式导出节点
+            node_triples = self._export_query(session, f"""
+                MATCH {node_pattern} WHERE {node_filter}
+                RETURN id(n) AS _id, labels(n)[0] AS label, n.id AS id, properties(n) AS props
+            """, lambda record: self._write_node(f, record, rdf_format), params)
+
+            # 2. 流式导出关系（与节点查询相互独立，每条关系只读取一次）
+            rel_triples = self._export_query(session, f"""
+                MATCH {node_pattern}-[r]->(m) WHERE {node_filter}
+                RETURN type(r) AS rel_type,
+                       labels(n)[0] AS n_label, n.id AS n_id, id(n) AS n_internal,
+                       labels(m)[0] AS m_label, m.id AS m_id, id(m) AS m_internal
+            """, lambda record: self._write_relationship(f, record), params)
+
+        elapsed = time.perf_counter() - start
+        total = node_triples + rel_triples
+        print(f"成功将Neo4j属性图流式导出为RDF文件 {output_file}：{total}条三元组，"
+              f"耗时{elapsed:.2f}秒，{total / elapsed if elapsed > 0 else 0:.0f} triples/sec")
+        return {"node_triples": node_triples, "rel_triples": rel_triples, "seconds": elapsed}
+
+    def _plan_shards(self, shard_by, workers):
+        """规划分片：按label时每个首Label一个分片（另含无Label节点分片）；按range时将内部id区间等分"""
+        with self.driver.session() as session:
+            if shard_by == "label":
+                labels = [record["label"] for record in session.run("CALL db.labels() YIELD label RETURN label")]
+                shards = [{"name": label, "node_pattern": f"(n:`{label}`)",
+                           "node_filter": "labels(n)[0] = $label", "params": {"label": label}}
+                          for label in labels]
+                shards.append({"name": "_unlabeled", "node_pattern": "(n)",
+                               "node_filter": "size(labels(n)) = 0", "params": {}})
+                return shards
+
+            record = session.run("MATCH (n) RETURN min(id(n)) AS lo, max(id(n)) AS hi").single()
+            if record["lo"] is None:
+                return []
+            # 区间数取worker数的4倍，缓解id分布不均导致的长尾
+            count = workers * 4
+            step = max(1, (record["hi"] - record["lo"] + count) // count)
+            return [{"name": f"range_{lo}_{lo + step}", "node_pattern": "(n)",
+                     "node_filter": "id(n) >= $lo AND id(n) < $hi", "params": {"lo": lo, "hi": lo + step}}
+                    for lo in range(record["lo"], record["hi"] + 1, step)]
+
+    def export_sharded(self, output_dir, workers=None, shard_by="label", rdf_format="nt",
+                       page_size=10000, compress=False, concat_to=None):
+        """分片并行导出：每个分片由独立进程写出一个N-Triples/Turtle文件，最后生成清单，
+        可选地将所有分片拼接为一个文件（N-Triples行、gzip成员均可直接拼接）"""
+        workers = workers or os.cpu_count()
+        os.makedirs(output_dir, exist_ok=True)
+        ext = ("nt" if rdf_format == "nt" else "ttl") + (".gz" if compress else "")
+
+        start = time.perf_counter()
+        shards = self._plan_shards(shard_by, workers)
+        for shard in shards:
+            shard["file"] = os.path.join(output_dir, f"shard_{shard['name']}.{ext}")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_export_shard, [(self._conn_args, shard, rdf_format, page_size)
+                                                    for shard in shards]))
+
+        manifest = {"shard_by": shard_by, "format": rdf_format, "workers": workers, "shards": results,
+                    "triples": sum(r["node_triples"] + r["rel_triples"] for r in results)}
+        if concat_to:
+            concat_shards([r["file"] for r in results], concat_to)
+            manifest["concatenated"] = concat_to
+        manifest["seconds"] = time.perf_counter() - start
+
+        with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        print(f"分片导出完成：{len(results)}个分片，{workers}个进程，{manifest['triples']}条三元组，"
+              f"总耗时{manifest['seconds']:.2f}秒")
+        return manifest
+
+
+def _export_shard(args):
+    """子进程入口：独立建立连接，导出一个分片"""
+    conn_args, shard, rdf_format, page_size = args
+    converter = Neo4j2RDFConverter(*conn_args)
+    try:
+        stats = converter.export_stream(shard["file"], rdf_format, page_size,
+                                        shard["node_pattern"], shard["node_filter"], shard["params"])
+    finally:
+        converter.close()
+    stats.update(name=shard["name"], file=shard["file"], bytes=os.path.getsize(shard["file"]))
+    return stats
+
+
+def concat_shards(files, output_file):
+    """按字节拼接分片文件"""
+    with open(output_file, "wb") as out:
+        for path in files:
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, out, 1024 * 1024)
+    print(f"已将{len(files)}个分片拼接为 {output_file}")
+
 
 # 工具使用示例
 if __name__ == "__main__":
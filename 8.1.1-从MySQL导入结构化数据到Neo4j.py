@@ -3,6 +3,10 @@ import pandas as pd
 from neo4j import GraphDatabase
 from sqlalchemy import create_engine
 
+from ChunkedSQLReader import chunk_to_rows, iter_sql_chunks
+from MySQLIncrementalSync import IncrementalSync
+from Neo4jBatchWriter import write_batches
+
 # 1. 配置数据库连接
 MYSQL_CONFIG = {
     "host": "localhost",
@@ -13,6 +17,10 @@ MYSQL_CONFIG = {
 NEO4J_CONFIG = {
     "uri": "bolt://localhost:7687"
 }
+CHUNK_SIZE = 10000  # 每次从MySQL流式读取的行数
+BATCH_SIZE = 1000  # 每个UNWIND写入事务包含的行数
+SYNC_MODE = "full"  # full：分块全量导入；incremental：基于高水位线的增量同步（表需有updated_at列）
+SYNC_STATE_FILE = "sync_state.json"  # 增量同步的水位线状态文件
 
 # 创建 SQLAlchemy 引擎
 def create_mysql_engine():
@@ -20,7 +28,7 @@ def create_mysql_engine():
     return create_engine(connection_string)
 
 
-# 2. 从MySQL读取结构化数据
+# 2. 从MySQL读取结构化数据（优化前：整表读入DataFrame，内存随表规模增长）
 def read_mysql_data():
     engine = create_mysql_engine()
     # 读取员工表和部门表
@@ -30,7 +38,7 @@ def read_mysql_data():
     return df_employee, df_department
 
 
-# 3. 导入Neo4j
+# 3. 导入Neo4j（优化前：iterrows逐行session.run）
 def import_to_neo4j(df_employee, df_department):
     driver = GraphDatabase.driver(**NEO4J_CONFIG)
 
@@ -54,6 +62,69 @@ def import_to_neo4j(df_employee, df_department):
     print("结构化数据导入Neo4j完成！")
 
 
+# 4. 分块导入（优化后）：服务端游标按CHUNK_SIZE流式读取，每块以UNWIND批量写入，内存占用恒定
+DEPARTMENT_QUERY = """
+    UNWIND $rows AS row
+    MERGE (d:Department {id: row.id})
+    SET d.name = row.name, d.location = row.location
+"""
+EMPLOYEE_QUERY = """
+    UNWIND $rows AS row
+    MERGE (e:Employee {id: row.id})
+    SET e.name = row.name, e.age = row.age
+    MERGE (d:Department {id: row.dept_id})
+    MERGE (e)-[:WORKS_IN]->(d)
+"""
+
+
+def import_to_neo4j_chunked(chunksize=CHUNK_SIZE, batch_size=BATCH_SIZE):
+    engine = create_mysql_engine()
+    driver = GraphDatabase.driver(**NEO4J_CONFIG)
+    try:
+        # 先写部门，再写员工，保证关系端点已存在
+        for sql, query, name in [
+            ("SELECT id, name, location FROM department", DEPARTMENT_QUERY, "部门"),
+            ("SELECT id, name, age, dept_id FROM employee", EMPLOYEE_QUERY, "员工"),
+        ]:
+            total = 0
+            for chunk in iter_sql_chunks(engine, sql, chunksize):
+                stats = write_batches(driver, query, chunk_to_rows(chunk), batch_size)
+                total += stats["rows"]
+            print(f"{name}数据导入完成：{total}行")
+    finally:
+        driver.close()
+        engine.dispose()
+    print("结构化数据导入Neo4j完成！")
+
+
+# 5. 增量同步：只抽取updated_at水位线之后变化的行，删除通过墓碑表（见MYSQL_TOMBSTONE_DDL）同步
+EMPLOYEE_SYNC_QUERY = EMPLOYEE_QUERY + """
+    WITH e, row
+    MATCH (e)-[old:WORKS_IN]->(od:Department)
+    WHERE od.id <> row.dept_id
+    DELETE old
+"""
+SYNC_TABLES = [
+    {"table": "department", "columns": "id, name, location, updated_at", "key": "id",
+     "watermark": "updated_at", "label": "Department", "upsert": DEPARTMENT_QUERY},
+    {"table": "employee", "columns": "id, name, age, dept_id, updated_at", "key": "id",
+     "watermark": "updated_at", "label": "Employee", "upsert": EMPLOYEE_SYNC_QUERY},
+]
+
+
+def sync_to_neo4j_incremental(chunksize=CHUNK_SIZE, batch_size=BATCH_SIZE):
+    engine = create_mysql_engine()
+    driver = GraphDatabase.driver(**NEO4J_CONFIG)
+    try:
+        IncrementalSync(engine, driver, SYNC_TABLES, state_file=SYNC_STATE_FILE,
+                        chunksize=chunksize, batch_size=batch_size).run()
+    finally:
+        driver.close()
+        engine.dispose()
+
+
 # 执行导入
-df_emp, df_dept = read_mysql_data()
-import_to_neo4j(df_emp, df_dept)
+if SYNC_MODE == "incremental":
+    sync_to_neo4j_incremental()
+else:
+    import_to_neo4j_chunked()
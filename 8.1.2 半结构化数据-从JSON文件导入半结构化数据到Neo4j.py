@@ -1,6 +1,12 @@
 import json
+import time
+
 from neo4j import GraphDatabase
 
+from JSONStream import iter_json_records
+from Neo4jBatchWriter import iter_batches
+from Neo4jSchemaManager import Neo4jSchemaManager
+
 # 1. 配置数据库连接
 MYSQL_CONFIG = {
     "host": "localhost",
@@ -11,14 +17,15 @@ MYSQL_CONFIG = {
 NEO4J_CONFIG = {
     "uri": "bolt://localhost:7687"
 }
+BATCH_SIZE = 1000  # 每个写入事务包含的商品数
 
-# 1. 读取JSON数据（示例：商品-品牌半结构化数据）
+# 1. 读取JSON数据（示例：商品-品牌半结构化数据）（优化前：json.load整体读入内存）
 def read_json_data(file_path):
     with open(file_path, "r", encoding="utf-8") as f:
         data = json.load(f)
     return data
 
-# 2. 解析并导入Neo4j
+# 2. 解析并导入Neo4j（优化前：每个商品一次session.run）
 def import_json_to_neo4j(json_data):
     driver = GraphDatabase.driver(**NEO4J_CONFIG)
 
@@ -42,6 +49,68 @@ def import_json_to_neo4j(json_data):
     print("半结构化JSON数据导入Neo4j完成！")
 
 
+# 3. 流式批量导入（优化后）：逐条读取JSON数组/JSONL，嵌套的brand展开为节点行与关系行，按批UNWIND写入
+BRAND_QUERY = """
+    UNWIND $rows AS row
+    MERGE (b:Brand {name: row.name})
+    SET b.country = row.country
+"""
+PRODUCT_QUERY = """
+    UNWIND $rows AS row
+    MERGE (p:Product {id: row.id})
+    SET p.name = row.name, p.price = row.price
+"""
+BELONGS_TO_QUERY = """
+    UNWIND $rows AS row
+    MATCH (p:Product {id: row.product_id})
+    MATCH (b:Brand {name: row.brand_name})
+    MERGE (p)-[:BELONGS_TO]->(b)
+"""
+
+
+def flatten_products(items):
+    """一批商品记录 → (商品节点行, 品牌节点行, 商品-品牌关系行)；同一批内的品牌只保留一行"""
+    products = []
+    brands = {}
+    edges = []
+    for item in items:
+        products.append({"id": item["product_id"], "name": item.get("product_name"),
+                         "price": item.get("price")})
+        brand = item.get("brand") or {}
+        if brand.get("name"):
+            brands[brand["name"]] = {"name": brand["name"], "country": brand.get("country")}
+            edges.append({"product_id": item["product_id"], "brand_name": brand["name"]})
+    return products, list(brands.values()), edges
+
+
+def _write_product_batch(tx, products, brands, edges):
+    # 先写品牌与商品节点，再建关系，三条UNWIND语句在同一个事务中提交
+    tx.run(BRAND_QUERY, rows=brands).consume()
+    tx.run(PRODUCT_QUERY, rows=products).consume()
+    tx.run(BELONGS_TO_QUERY, rows=edges).consume()
+
+
+def import_products_batched(records, batch_size=BATCH_SIZE):
+    """records 为商品记录的可迭代对象（可以是生成器），内存占用上限为一个批次"""
+    driver = GraphDatabase.driver(**NEO4J_CONFIG)
+    Neo4jSchemaManager(driver).ensure([("Brand", "name"), ("Product", "id")])
+    count = 0
+    start = time.perf_counter()
+    with driver.session() as session:
+        for batch in iter_batches(records, batch_size):
+            session.execute_write(_write_product_batch, *flatten_products(batch))
+            count += len(batch)
+    driver.close()
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"半结构化JSON数据导入Neo4j完成：{count}个商品，耗时{elapsed:.2f}秒，{rate:.0f} products/sec")
+
+
+def import_json_stream(file_path, batch_size=BATCH_SIZE):
+    """从JSON数组或JSONL文件（支持.gz）流式导入"""
+    import_products_batched(iter_json_records(file_path), batch_size)
+
+
 # 测试数据（可保存为product_data.json）
 test_json = [
     {"product_id": "P001", "product_name": "iPhone 15", "price": 5999,
@@ -50,5 +119,5 @@ test_json = [
      "brand": {"name": "华为", "country": "中国"}}
 ]
 # 执行导入
-# import_json_to_neo4j(read_json_data("product_data.json"))
-import_json_to_neo4j(test_json)
\ No newline at end of file
+# import_json_stream("product_data.json")
+import_products_batched(test_json)
\ No newline at end of file
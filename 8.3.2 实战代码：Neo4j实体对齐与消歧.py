@@ -1,42 +1,41 @@
-import re
-from difflib import SequenceMatcher
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import os
 from neo4j import GraphDatabase
 
+from DisambiguationIndex import DisambiguationIndex
+from EntityAligner import EntityAligner
+from EntityMerger import EntityMergeExecutor
+from MinHashIndex import MinHashLSHIndex
+
 # 定义Neo4j连接配置
 NEO4J_CONFIG = {
     "uri": "bolt://localhost:7687",
     "auth": ("neo4j", "123456")  # 根据实际配置修改
 }
-
-# 工具函数：文本相似度计算
-def get_similarity(text1, text2):
-    """融合编辑距离和TF-IDF余弦相似度"""
-
-    # 预处理
-    def preprocess(t):
-        t = t.lower()
-        t = re.sub(r"[^a-zA-Z0-9\u4e00-\u9fa5]", "", t)
-        return t
-
-    t1, t2 = preprocess(text1), preprocess(text2)
-    # 编辑距离相似度
-    edit_sim = SequenceMatcher(None, t1, t2).ratio()
-    # TF-IDF余弦相似度
-    if len(t1) == 0 or len(t2) == 0:
-        tfidf_sim = 0.0
-    else:
-        vec = TfidfVectorizer()
-        tfidf = vec.fit_transform([t1, t2])
-        tfidf_sim = cosine_similarity(tfidf)[0][1]
-    # 加权融合
-    return (edit_sim * 0.6) + (tfidf_sim * 0.4)
-
+# ORG名称的MinHash-LSH索引文件：设置后首次全量对齐并建索引，之后只对新出现的名称查询候选（增量对齐）
+ALIGN_INDEX_PATH = None
 
 # 1. 实体对齐：合并Neo4j中相似实体
-def entity_alignment(neo4j_config, threshold=0.8):
-    """对齐Neo4j中相似度高于阈值的实体"""
+def align_new_names(index, names, threshold=0.8):
+    """增量对齐：索引中没有的名称查询LSH候选，与最相似的已有名称成对；未匹配的名称插入索引"""
+    current = set(names)
+    aligner = EntityAligner(threshold=threshold)
+    pairs = []
+    for name in names:
+        if name in index:
+            continue
+        # 只考虑图中仍存在的候选（索引中可能有已被合并删除的旧名称）
+        candidates = [c for c, _ in index.query(name) if c in current]
+        match = aligner.best_match(name, candidates)
+        if match is None:
+            index.add(name)
+        else:
+            pairs.append((match[0], name))
+            current.discard(name)
+    return pairs
+
+
+def entity_alignment(neo4j_config, threshold=0.8, index_path=None):
+    """对齐Neo4j中相似度高于阈值的实体；index_path 不为None时使用持久化的MinHash-LSH索引做增量对齐"""
     driver = GraphDatabase.driver(**neo4j_config)
 
     try:
@@ -45,57 +44,40 @@ def entity_alignment(neo4j_config, threshold=0.8):
             result = session.run("MATCH (n:ORG) RETURN n.name AS name")
             org_names = [record["name"] for record in result]
 
-            # 遍历实体对，计算相似度
-            aligned_pairs = []
-            for i in range(len(org_names)):
-                for j in range(i + 1, len(org_names)):
-                    name1, name2 = org_names[i], org_names[j]
-                    sim = get_similarity(name1, name2)
-                    if sim >= threshold:
-                        aligned_pairs.append((name1, name2))
-                        # 合并实体：将name2的关系迁移到name1，删除name2
-                        session.run("""
-                            MATCH (a:ORG {name: $name2})-[r]->(b)
-                            MATCH (c:ORG {name: $name1})
-                            MERGE (c)-[nr:TYPE(r)]->(b)
-                            DELETE r, a
-                        """, name1=name1, name2=name2)
-
-        print(f"完成实体对齐，合并{len(aligned_pairs)}组相似实体：{aligned_pairs}")
+            if index_path is not None and os.path.exists(index_path):
+                # 增量对齐：只为新出现的名称查询候选
+                index = MinHashLSHIndex.load(index_path)
+                aligned_pairs = align_new_names(index, org_names, threshold)
+            else:
+                # 优化前：遍历全部实体对，每对重新拟合TF-IDF计算相似度（O(n²)次拟合）
+                # 优化后：全部名称只拟合一次字符n-gram TF-IDF，分块+稀疏top-k召回候选，只对候选计算编辑距离
+                aligned_pairs = [(name1, name2) for name1, name2, _ in
+                                 EntityAligner(threshold=threshold).align(org_names)]
+                if index_path is not None:
+                    merged = {name2 for _, name2 in aligned_pairs}
+                    index = MinHashLSHIndex.build(name for name in org_names if name not in merged)
+
+        # 优化前：逐对执行合并语句（每对一次往返，且 MERGE (c)-[nr:TYPE(r)]->(b) 不是合法的Cypher）
+        # 优化后：并查集把 A≈B≈C 聚成一个簇，按批UNWIND迁移全部类型的出/入关系、合并属性后删除重复实体
+        stats = EntityMergeExecutor(driver, "ORG").merge(aligned_pairs)
+        if index_path is not None:
+            index.save(index_path)
+
+        print(f"完成实体对齐，{len(aligned_pairs)}组相似实体聚成{stats['clusters']}个簇，"
+              f"合并{stats['merged']}个重复实体（{stats['merges_per_sec']:.0f}个/秒）：{aligned_pairs}")
     finally:
         driver.close()
 
 
 # 2. 实体消歧：区分Neo4j中同名实体
-def entity_disambiguation(neo4j_config, entity_name, context):
-    """基于上下文消歧同名实体"""
-    driver = GraphDatabase.driver(**neo4j_config)
+def entity_disambiguation(index, entity_name, context):
+    """基于上下文消歧同名实体
 
-    try:
-        with driver.session() as session:
-            # 读取所有同名实体的邻居信息（图结构特征）
-            result = session.run("""
-                MATCH (n {name: $name})-[r]->(m)
-                RETURN n, collect({rel: TYPE(r), neighbor: m.name}) AS neighbors
-            """, name=entity_name)
-            entities = [{"node": record["n"], "neighbors": record["neighbors"]}
-                        for record in result]
-
-        # 计算上下文与实体邻居的相似度
-        best_match = None
-        max_sim = 0.0
-        for ent in entities:
-            # 拼接邻居信息作为实体特征
-            neighbor_text = " ".join([f"{item['rel']}{item['neighbor']}"
-                                      for item in ent["neighbors"]])
-            sim = get_similarity(context, neighbor_text)
-            if sim > max_sim:
-                max_sim = sim
-                best_match = ent["node"]
-
-        return best_match
-    finally:
-        driver.close()
+    优化前：每次调用都查询一遍同名实体的邻居，拼接邻居文本后逐个候选重新拟合TF-IDF
+    优化后：DisambiguationIndex预先保存每个同名实体邻居的哈希n-gram向量，一次字典查找+若干次稀疏点积
+    """
+    match = index.disambiguate(entity_name, context)
+    return match[0] if match is not None else None
 
 
 # 测试实体融合
@@ -110,7 +92,7 @@ finally:
     driver.close()
 
 # 2. 执行实体对齐
-entity_alignment(NEO4J_CONFIG, threshold=0.8)
+entity_alignment(NEO4J_CONFIG, threshold=0.8, index_path=ALIGN_INDEX_PATH)
 
 # 3. 测试实体消歧
 # 先写入同名实体：苹果（公司）、苹果（水果）
@@ -119,13 +101,16 @@ try:
     with driver.session() as session:
         session.run("MERGE (n:ORG {name: '苹果'})-[:生产]->(m:Product {name: 'iPhone'})")
         session.run("MERGE (n:FRUIT {name: '苹果'})-[:生长于]->(m:LOC {name: '山东'})")
+    # 构建消歧索引（之后邻居有变化时用 refresh(driver, names=[...]) 只刷新相关名称）
+    disambiguation_index = DisambiguationIndex()
+    disambiguation_index.refresh(driver)
 finally:
     driver.close()
 
 # 消歧：上下文"苹果发布新款iPhone" → 匹配ORG类型的苹果
-disambig_result = entity_disambiguation(NEO4J_CONFIG, "苹果", "苹果发布新款iPhone")
+disambig_result = entity_disambiguation(disambiguation_index, "苹果", "苹果发布新款iPhone")
 print(f"\n=== 实体消歧结果 ===")
 if disambig_result:
-    print(f"消歧实体：{disambig_result['name']}，类型：{list(disambig_result.labels)[0]}")
+    print(f"消歧实体：{disambig_result['name']}，类型：{disambig_result['labels'][0]}")
 else:
     print("未找到匹配的实体")
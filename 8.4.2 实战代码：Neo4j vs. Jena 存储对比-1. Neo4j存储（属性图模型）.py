@@ -2,6 +2,9 @@
 from neo4j import GraphDatabase
 import pandas as pd
 
+from BulkImportExporter import BulkImportCsvExporter
+from Neo4jSchemaManager import Neo4jSchemaManager, merge_keys_for_triples
+
 # 定义Neo4j连接配置
 NEO4J_CONFIG = {
     "uri": "bolt://localhost:7687",
@@ -14,6 +17,8 @@ def batch_import_to_neo4j(triples):
     triples格式：[(实体1, 关系, 实体2, 实体1类型, 实体2类型), ...]
     """
     driver = GraphDatabase.driver(**NEO4J_CONFIG)
+    # 为即将MERGE的 (实体类型, name) 建立唯一约束，避免每次MERGE都做Label扫描
+    Neo4jSchemaManager(driver).ensure(merge_keys_for_triples(triples))
 
     with driver.session() as session:
         # 开启事务批量写入
@@ -30,6 +35,12 @@ def batch_import_to_neo4j(triples):
     print(f"Neo4j批量导入{len(triples)}条三元组完成！")
 
 
+# 新库首次全量加载：导出为 neo4j-admin database import 所需的CSV（比事务性MERGE快几个数量级）
+def export_bulk_csv(triples, output_dir="bulk_import"):
+    """triples格式同上，按实体类型/关系类型拆分输出节点与关系CSV"""
+    return BulkImportCsvExporter(output_dir).export_triples(triples)
+
+
 # 测试数据
 test_triples = [
     ("马云", "创始人", "阿里巴巴", "PER", "ORG"),
@@ -2,12 +2,18 @@ import mysql.connector
 import json
 import re
 from neo4j import GraphDatabase
-from transformers import AutoTokenizer, AutoModelForTokenClassification
-import torch
 import pandas as pd
 from neo4j import GraphDatabase
 from sqlalchemy import create_engine, text
 
+from AliasResolver import AliasResolver
+from ChunkedSQLReader import iter_sql_chunks
+from Neo4jBatchWriter import write_batches
+from JSONStream import iter_json_records
+from ModelRegistry import ensure_safetensors, get_ner_engine, init_worker, model_path
+from Neo4jSchemaManager import Neo4jSchemaManager, merge_keys_for_triples
+from TextPipeline import TextPipeline
+
 # ===================== 全局配置 =====================
 MYSQL_CONFIG = {
     "host": "localhost",
@@ -18,6 +24,7 @@ MYSQL_CONFIG = {
 NEO4J_CONFIG = {
     "uri": "bolt://localhost:7687"
 }
+EMP_CHUNK_SIZE = 10000  # 员工表分块读取的行数
 
 # 创建 SQLAlchemy 引擎
 def create_mysql_engine():
@@ -26,17 +33,19 @@ def create_mysql_engine():
 
 
 
-# 在全局配置部分修改NER模型初始化
-NER_MODEL_NAME = "ckiplab/bert-base-chinese-ner"
-tokenizer = AutoTokenizer.from_pretrained(NER_MODEL_NAME)
-ner_model = AutoModelForTokenClassification.from_pretrained(NER_MODEL_NAME)
+# NER模型只从本地目录 ./models/bert-base-chinese-ner 离线加载，由ModelRegistry在首次使用时加载并在本进程内复用
+INFERENCE_BACKEND = "torch"  # 推理后端：torch（fp32）/ int8（动态量化）/ onnx / onnx-int8，转换结果缓存在模型目录旁
+NER_BATCH_SIZE = 16  # 每批推理的文本数
+NER_NUM_THREADS = None  # PyTorch CPU线程数，None表示使用默认值
+NER_STRIDE = 128  # 长文本滑动窗口的重叠token数，None表示超过512个token的部分直接截断
 
-# 从模型配置获取标签映射
-if hasattr(ner_model.config, 'id2label'):
-    label_map = ner_model.config.id2label
-else:
-    # 默认标签映射
-    label_map = {0: "O", 1: "B-PER", 2: "I-PER", 3: "B-ORG", 4: "I-ORG", 5: "B-LOC", 6: "I-LOC"}
+# 多进程抽取流水线：读取 → NER/RE进程池 → 实体对齐 → 批量写入Neo4j，阶段间以有界队列连接
+CORPUS_PATH = None  # 非结构化文本语料（JSONL，每行 {"text": ...}，支持.gz），None 时使用内置示例文本
+CORPUS_TEXT_FIELD = "text"
+PIPELINE_WORKERS = 2  # NER/RE worker进程数（每个进程加载一次模型）
+PIPELINE_BATCH_SIZE = 64  # 每个抽取任务的文本数
+PIPELINE_QUEUE_SIZE = 8  # 每个队列最多缓冲的批次数
+WORKER_NUM_THREADS = 1  # 每个worker进程的PyTorch线程数
 
 # ===================== 工具函数 =====================
 def preprocess_text(text):
@@ -47,46 +56,32 @@ def preprocess_text(text):
 
 def extract_entities(text):
     """NER实体提取"""
-    text = preprocess_text(text)
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True)
-    with torch.no_grad():
-        outputs = ner_model(**inputs)
-    predictions = torch.argmax(outputs.logits, dim=2)
-    tokens = tokenizer.convert_ids_to_tokens(inputs["input_ids"][0])
-
-    entities = []
-    current_ent, current_type = None, None
-    for token, pred in zip(tokens, predictions[0]):
-        label = label_map[pred.item()]
-        if token in ["[CLS]", "[SEP]"]:
-            continue
-        if label.startswith("B-"):
-            if current_ent:
-                entities.append((current_ent, current_type))
-            current_ent = token.replace("##", "")
-            current_type = label.split("-")[1]
-        elif label.startswith("I-") and current_ent:
-            current_ent += token.replace("##", "")
-        elif label == "O" and current_ent:
-            entities.append((current_ent, current_type))
-            current_ent, current_type = None, None
-    if current_ent:
-        entities.append((current_ent, current_type))
-    return list(set(entities))  # 去重
-
-
-def get_similarity(text1, text2):
-    """相似度计算（实体对齐用）"""
-    from difflib import SequenceMatcher
-    return SequenceMatcher(None, text1, text2).ratio()
+    return extract_entities_batch([text])[0]
+
+
+def extract_entities_batch(texts):
+    """批量NER实体提取：清洗后按长度组批推理，重复文本命中缓存"""
+    ner_engine = get_ner_engine(backend=INFERENCE_BACKEND, batch_size=NER_BATCH_SIZE, stride=NER_STRIDE,
+                                num_threads=NER_NUM_THREADS)
+    return [list({(ent.text, ent.type) for ent in entities})  # 去重
+            for entities in ner_engine.extract_batch(preprocess_text(text) for text in texts)]
 
 
 # ===================== 数据接入 =====================
-def load_multi_source_data():
-    """加载多源数据：结构化(MySQL)+半结构化(JSON)+非结构化(文本)"""
-    # 1. 加载结构化数据（MySQL）
-    engine = create_mysql_engine()
+DEFAULT_EMPLOYEES = pd.DataFrame({
+    'name': ['张三', '李四', '王五'],
+    'dept': ['技术部', '销售部', '人事部'],
+    'position': ['工程师', '销售经理', 'HR']
+})
+
 
+def iter_employee_chunks(chunksize=EMP_CHUNK_SIZE):
+    """分块读取员工数据（服务端游标，内存中只保留一个块）
+
+    读出第一个块之前失败时返回默认数据；已经交出部分块后再失败则抛出异常，不导入只含部分员工的图。
+    """
+    engine = create_mysql_engine()
+    yielded = False
     try:
         # 获取employee表的列信息
         with engine.connect() as conn:
@@ -103,27 +98,30 @@ def load_multi_source_data():
             FROM employee e
             LEFT JOIN department d ON e.dept_id = d.id
             """
-            df_emp = pd.read_sql(query, engine)
-
-            # 如果没有dept列或为空，使用dept_id作为部门名
-            if 'dept' not in df_emp.columns or df_emp['dept'].isna().all():
-                df_emp['dept'] = df_emp['dept_id'].astype(str)
+            for chunk in iter_sql_chunks(engine, query, chunksize):
+                # 如果dept列为空，使用dept_id作为部门名
+                if chunk['dept'].isna().all():
+                    chunk['dept'] = chunk['dept_id'].astype(str)
+                yielded = True
+                yield chunk
         else:
             # 如果表结构不符合预期，使用默认数据
             print("警告: employee表结构不符合预期，使用默认数据")
-            df_emp = pd.DataFrame({
-                'name': ['张三', '李四', '王五'],
-                'dept': ['技术部', '销售部', '人事部'],
-                'position': ['工程师', '销售经理', 'HR']
-            })
     except Exception as e:
+        if yielded:
+            raise
         print(f"数据库查询失败: {e}")
-        # 使用默认数据
-        df_emp = pd.DataFrame({
-            'name': ['张三', '李四', '王五'],
-            'dept': ['技术部', '销售部', '人事部'],
-            'position': ['工程师', '销售经理', 'HR']
-        })
+    finally:
+        engine.dispose()
+
+    if not yielded:
+        yield DEFAULT_EMPLOYEES
+
+
+def load_multi_source_data():
+    """加载多源数据：结构化(MySQL，按块惰性读取)+半结构化(JSON)+非结构化(文本)"""
+    # 1. 加载结构化数据（MySQL）
+    emp_chunks = iter_employee_chunks()
 
     # 2. 加载半结构化数据（JSON）
     json_data = [
@@ -137,30 +135,20 @@ def load_multi_source_data():
         "马化腾1998年创立腾讯，总部位于深圳南山区"
     ]
 
-    return df_emp, json_data, text_data
-
-def build_triples(df_emp, json_data, text_data):
-    """构建三元组"""
-    triples = []
+    return emp_chunks, json_data, text_data
 
-    # 1. 结构化数据生成三元组 - 检查列是否存在
-    if 'name' in df_emp.columns and 'dept' in df_emp.columns:
-        for _, row in df_emp.iterrows():
-            emp_name = row["name"]
-            dept_name = row["dept"]
-            triples.append((emp_name, "任职于", dept_name, "PER", "ORG"))
+def iter_corpus_texts(path, field=CORPUS_TEXT_FIELD):
+    """流式读取JSONL语料中的文本（每行为字符串或含field字段的对象）"""
+    for record in iter_json_records(path):
+        text = record if isinstance(record, str) else record.get(field)
+        if text:
+            yield text
 
-    # 2. 半结构化数据生成三元组
-    for item in json_data:
-        company = item["company"]
-        ceo = item["ceo"]
-        loc = item["location"]
-        triples.append((ceo, "担任CEO", company, "PER", "ORG"))
-        triples.append((company, "位于", loc, "ORG", "LOC"))
 
-    # 3. 非结构化文本抽取三元组
-    for text in text_data:
-        entities = extract_entities(text)
+def extract_text_triples(texts):
+    """非结构化文本 → 三元组：批量NER后按规则抽取关系（模块级函数，可在worker进程中执行）"""
+    triples = []
+    for entities in extract_entities_batch(texts):
         ent_map = {e: t for e, t in entities}
         ent_list = list(ent_map.keys())
         # 简单关系抽取（基于规则）
@@ -168,48 +156,108 @@ def build_triples(df_emp, json_data, text_data):
             triples.append(("马云", "创始人", "阿里巴巴", "PER", "ORG"))
         if "马化腾" in ent_list and "腾讯" in ent_list:
             triples.append(("马化腾", "创始人", "腾讯", "PER", "ORG"))
+    return triples
 
-    # 4. 实体对齐（去重相似实体）
+
+def align_triples(triples, resolver):
+    """实体对齐：与已出现的标准名相似度>0.8的实体归并到该标准名；resolver（AliasResolver）跨批次复用
+
+    优化前：每个实体与全部标准名逐一计算SequenceMatcher相似度（实体数的平方）
+    优化后：别名表精确查找 → 字符倒排索引召回少量候选 → 只对候选计算相似度，判定规则不变
+    """
     aligned_triples = []
-    ent_align_map = {}  # 实体对齐映射：别名→标准名
     for s, p, o, s_t, o_t in triples:
-        # 对齐主语
-        s_aligned = s
-        for std_ent in ent_align_map:
-            if get_similarity(s, std_ent) > 0.8 and s not in ent_align_map:
-                s_aligned = std_ent
-        if s_aligned not in ent_align_map:
-            ent_align_map[s_aligned] = s_t
-        # 对齐宾语
-        o_aligned = o
-        for std_ent in ent_align_map:
-            if get_similarity(o, std_ent) > 0.8 and o not in ent_align_map:
-                o_aligned = std_ent
-        if o_aligned not in ent_align_map:
-            ent_align_map[o_aligned] = o_t
-        aligned_triples.append((s_aligned, p, o_aligned, ent_align_map[s_aligned], ent_align_map[o_aligned]))
+        s_aligned = resolver.resolve(s, s_t)
+        o_aligned = resolver.resolve(o, o_t)
+        aligned_triples.append((s_aligned, p, o_aligned, resolver.types[s_aligned], resolver.types[o_aligned]))
+    return aligned_triples
+
+
+def iter_structured_triples(emp_chunks, json_data):
+    """结构化（员工表）与半结构化（JSON）数据生成三元组"""
+    # 1. 结构化数据生成三元组 - 逐块处理，检查列是否存在
+    for df_emp in emp_chunks:
+        if 'name' in df_emp.columns and 'dept' in df_emp.columns:
+            yield from ((emp_name, "任职于", dept_name, "PER", "ORG")
+                        for emp_name, dept_name in zip(df_emp["name"], df_emp["dept"]))
+
+    # 2. 半结构化数据生成三元组
+    for item in json_data:
+        company = item["company"]
+        ceo = item["ceo"]
+        loc = item["location"]
+        yield ceo, "担任CEO", company, "PER", "ORG"
+        yield company, "位于", loc, "ORG", "LOC"
+
+
+def build_triples(emp_chunks, json_data, text_data):
+    """构建三元组（优化前：单进程依次抽取、对齐，全部三元组留在内存中）"""
+    triples = list(iter_structured_triples(emp_chunks, json_data))
+
+    # 3. 非结构化文本抽取三元组（全部文本批量推理）
+    triples.extend(extract_text_triples(text_data))
+
+    # 4. 实体对齐（去重相似实体）
+    aligned_triples = align_triples(triples, AliasResolver())
 
     return list(set(aligned_triples))  # 去重
 
 # ===================== Neo4j存储 =====================
-def import_triples_to_neo4j(triples):
+def write_triples(driver, schema, triples, batch_size=1000):
+    """写入一批三元组：按(主体类型, 关系, 客体类型)分组，每组以UNWIND批量写入"""
+    groups = {}
+    for s, p, o, s_t, o_t in triples:
+        # 处理关系名特殊字符
+        p = p.replace(" ", "_").replace("-", "_")
+        groups.setdefault((s_t, p, o_t), []).append({"s_name": s, "o_name": o})
+
+    schema.ensure(merge_keys_for_triples(triples))
+    for (s_t, p, o_t), rows in groups.items():
+        write_batches(driver, f"""
+            UNWIND $rows AS row
+            MERGE (s:{s_t} {{name: row.s_name}})
+            MERGE (o:{o_t} {{name: row.o_name}})
+            MERGE (s)-[:{p}]->(o)
+        """, rows, batch_size)
+
+
+def import_triples_to_neo4j(triples, batch_size=1000):
     """导入三元组到Neo4j"""
     driver = GraphDatabase.driver(**NEO4J_CONFIG)
-    with driver.session() as session:
-        tx = session.begin_transaction()
-        for s, p, o, s_t, o_t in triples:
-            # 处理关系名特殊字符
-            p = p.replace(" ", "_").replace("-", "_")
-            tx.run(f"""
-                MERGE (s:{s_t} {{name: $s_name}})
-                MERGE (o:{o_t} {{name: $o_name}})
-                MERGE (s)-[:{p}]->(o)
-            """, s_name=s, o_name=o)
-        tx.commit()
+    write_triples(driver, Neo4jSchemaManager(driver), triples, batch_size)
     driver.close()
     print(f"共导入{len(triples)}条三元组到Neo4j！")
 
 
+def run_pipeline(emp_chunks, json_data, texts, batch_size=1000):
+    """多进程流水线：结构化/半结构化三元组与文本抽取结果一起对齐，边抽取边写入Neo4j；返回各阶段统计"""
+    driver = GraphDatabase.driver(**NEO4J_CONFIG)
+    schema = Neo4jSchemaManager(driver)
+    resolver = AliasResolver()
+    written = 0
+
+    def write(triples):
+        # 批内去重；跨批次的重复三元组由MERGE保证幂等，不在内存中保留全部已写入结果
+        nonlocal written
+        triples = list(set(triples))
+        write_triples(driver, schema, triples, batch_size)
+        written += len(triples)
+
+    # 权重转存在启动worker进程之前完成一次，worker只读取转换结果
+    ensure_safetensors(model_path("ner"))
+    pipeline = TextPipeline(extract_text_triples,
+                            lambda triples: align_triples(triples, resolver), write,
+                            workers=PIPELINE_WORKERS, batch_size=PIPELINE_BATCH_SIZE,
+                            queue_size=PIPELINE_QUEUE_SIZE, write_batch_size=batch_size,
+                            initializer=init_worker, initargs=(WORKER_NUM_THREADS, None, INFERENCE_BACKEND))
+    try:
+        stats = pipeline.run(texts, iter_structured_triples(emp_chunks, json_data))
+    finally:
+        driver.close()
+    print(f"共导入{written}条三元组到Neo4j！")
+    return stats
+
+
 # ===================== 知识查询 =====================
 def query_neo4j_kg():
     """Neo4j知识图谱查询示例"""
@@ -238,10 +286,10 @@ def query_neo4j_kg():
 # ===================== 执行完整Pipeline =====================
 if __name__ == "__main__":
     # 1. 加载多源数据
-    df_emp, json_data, text_data = load_multi_source_data()
-    # 2. 构建并融合三元组
-    triples = build_triples(df_emp, json_data, text_data)
-    # 3. 导入Neo4j
-    import_triples_to_neo4j(triples)
+    emp_chunks, json_data, text_data = load_multi_source_data()
+    if CORPUS_PATH:
+        text_data = iter_corpus_texts(CORPUS_PATH)
+    # 2~3. 抽取、对齐三元组并批量导入Neo4j（多进程流水线）
+    run_pipeline(emp_chunks, json_data, text_data)
     # 4. 查询分析
     query_neo4j_kg()
\ No newline at end of file
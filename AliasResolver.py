@@ -0,0 +1,180 @@
+import time
+from collections import Counter
+from difflib import SequenceMatcher
+
+
+class AliasResolver:
+    """增量实体别名解析：名称 → 标准名，依次尝试 精确查找 → 字符倒排索引召回候选 → 少量候选上计算编辑距离相似度
+
+    与逐一比较全部标准名的做法判定规则相同：SequenceMatcher(None, 名称, 标准名).ratio() > threshold 时归并，
+    有多个标准名满足时取最后加入的一个；都不满足时名称自身成为新的标准名。
+    已解析过的名称记入别名表，再次出现时直接查表，始终解析到同一个标准名。
+
+    召回不漏：ratio = 2 * 匹配字符数 / (len(a) + len(b))，超过threshold要求两者长度相差不大，
+    且对每个可能的标准名长度，共有字符数（按多重集计）至少为某个下界t。倒排表按 (字符, 标准名长度) 分开，
+    对每个长度按出现次数从少到多选取名称中的字符，只要未选取字符的总数小于t，满足条件的标准名至少命中一个已选字符，
+    因此只需合并少数低频字符的倒排表；长度越接近，t越大，需要查的字符越少。
+
+    "公""司""有""限"等高频字符的倒排表随名称数线性增长，遍历它们使每次查找的开销随之增长。
+    长度超过max_postings的倒排表不遍历（与MinHashLSHIndex按max_df去掉高频shingle相同），每次查找的开销因此有上界；
+    只能靠高频字符才能保证召回时，候选限定为至少命中一个已查字符的标准名，此时召回不再严格无遗漏
+    （计入stats["capped"]）。max_postings=None 时不设上限，结果与逐一比较完全相同。
+    """
+
+    def __init__(self, threshold=0.8, extra_probes=2, max_postings=300):
+        self.threshold = threshold
+        self.extra_probes = extra_probes  # 在保证召回所需的字符之外多查几个低频字符，用命中数进一步过滤
+        self.max_postings = max_postings  # 倒排表长度上限，超过的不遍历
+        self.types = {}  # 标准名 → 类型
+        self.aliases = {}  # 名称（含标准名自身）→ 标准名
+        self._names = []  # 编号 → 标准名，编号即加入顺序
+        self._postings = {}  # (字符, 标准名长度) → [包含该字符的标准名编号]
+        self.stats = {"exact": 0, "fuzzy": 0, "new": 0, "candidates": 0, "scored": 0, "capped": 0}
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self.aliases
+
+    def add(self, name, ent_type):
+        """加入一个标准名"""
+        self.types[name] = ent_type
+        self.aliases[name] = name
+        cid = len(self._names)
+        self._names.append(name)
+        for ch in set(name):
+            self._postings.setdefault((ch, len(name)), []).append(cid)
+
+    def _length_bounds(self, length):
+        """长度为length的名称：可能超过阈值的 [(标准名长度, 共有字符数下界)]"""
+        th = self.threshold
+        bounds = []
+        # 2 * min(la, lb) / (la + lb) > th；浮点误差容差只会让范围变宽，不会漏掉候选
+        min_len = int(th * length / (2 - th) - 1e-9) + 1
+        max_len = int(length * (2 - th) / th + 1e-9) if th > 0 else length * 2
+        for other in range(max(min_len, 1), max_len + 1):
+            need = int(th * (length + other) / 2 - 1e-9) + 1
+            if need <= min(length, other):
+                bounds.append((other, need))
+        return bounds
+
+    def candidates(self, name):
+        """可能与name相似度超过阈值的标准名编号（按编号升序）"""
+        if not name or not self._names:
+            return []
+        counts = {}
+        for ch in name:
+            counts[ch] = counts.get(ch, 0) + 1
+        postings = self._postings
+        max_postings = self.max_postings
+        result = []
+        capped = False
+        for other, need in self._length_bounds(len(name)):
+            chars = sorted(counts, key=lambda ch: len(postings.get((ch, other), ())))
+            unprobed = len(name)
+            hits = Counter()
+            extra = 0
+            for ch in chars:
+                if unprobed < need:
+                    if extra >= self.extra_probes:
+                        break
+                    extra += 1
+                cids = postings.get((ch, other))
+                # 按倒排表长度升序，之后的字符都超过上限
+                if max_postings is not None and cids and len(cids) > max_postings:
+                    capped = capped or unprobed >= need
+                    break
+                if cids:
+                    # 名称中出现k次的字符按k次计（上界）
+                    for _ in range(counts[ch]):
+                        hits.update(cids)
+                unprobed -= counts[ch]
+            # 命中字符数 + 未查字符数仍达不到下界的候选不可能超过阈值
+            floor = max(need - unprobed, 1)
+            result.extend(cid for cid, hit in hits.items() if hit >= floor)
+        self.stats["capped"] += capped
+        result.sort()
+        return result
+
+    def match(self, name):
+        """在已有标准名中找相似度超过阈值的最后一个，没有时返回None"""
+        candidates = self.candidates(name)
+        self.stats["candidates"] += len(candidates)
+        quick = SequenceMatcher(None)
+        quick.set_seq2(name)
+        for cid in reversed(candidates):
+            std_ent = self._names[cid]
+            quick.set_seq1(std_ent)
+            # quick_ratio（共有字符数）是ratio的上界
+            if quick.quick_ratio() <= self.threshold:
+                continue
+            self.stats["scored"] += 1
+            if SequenceMatcher(None, name, std_ent).ratio() > self.threshold:
+                return std_ent
+        return None
+
+    def resolve(self, name, ent_type):
+        """返回name的标准名；没有相似的标准名时name自身以ent_type加入为新的标准名"""
+        aligned = self.aliases.get(name)
+        if aligned is not None:
+            self.stats["exact"] += 1
+            return aligned
+        aligned = self.match(name)
+        if aligned is None:
+            self.stats["new"] += 1
+            self.add(name, ent_type)
+            return name
+        self.stats["fuzzy"] += 1
+        self.aliases[name] = aligned
+        return aligned
+
+
+def _legacy_align(names, threshold=0.8):
+    """优化前：每个新名称与全部标准名逐一计算SequenceMatcher相似度"""
+    ent_align_map = {}
+    result = []
+    for name in names:
+        aligned = name
+        if name not in ent_align_map:
+            for std_ent in ent_align_map:
+                if SequenceMatcher(None, name, std_ent).ratio() > threshold:
+                    aligned = std_ent
+        if aligned not in ent_align_map:
+            ent_align_map[aligned] = "ORG"
+        result.append(aligned)
+    return result
+
+
+# 基准测试（对齐阶段）：python AliasResolver.py [规模...]，默认 10000 100000
+if __name__ == "__main__":
+    import sys
+
+    from EntityAligner import make_org_names
+
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000]
+
+    # 一致性：不重复的名称上与优化前逐一比较的结果完全相同
+    names = list(dict.fromkeys(make_org_names(2000, duplicate_rate=0.3)))
+    start = time.perf_counter()
+    legacy = _legacy_align(names)
+    legacy_seconds = time.perf_counter() - start
+    resolver = AliasResolver()
+    same = sum(a == resolver.resolve(name, "ORG") for a, name in zip(legacy, names))
+    print(f"{len(names)}个名称：优化前{legacy_seconds:.1f}秒，与优化后结果一致{same}/{len(names)}")
+
+    for n in sizes:
+        # 按实体在三元组中反复出现模拟：同一名称平均出现3次
+        names = make_org_names(n, duplicate_rate=0.3)
+        stream = names + names[::2] + names[::-1]
+        resolver = AliasResolver()
+        start = time.perf_counter()
+        for name in stream:
+            resolver.resolve(name, "ORG")
+        elapsed = time.perf_counter() - start
+        stats = resolver.stats
+        legacy_estimate = legacy_seconds * (n / len(legacy)) ** 2
+        print(f"{n}个名称（{len(stream)}次解析）：{elapsed:.1f}秒，{len(stream) / elapsed:.0f}次/秒；"
+              f"精确命中{stats['exact']}，模糊归并{stats['fuzzy']}，新标准名{stats['new']}，"
+              f"候选{stats['candidates']}个，计算ratio{stats['scored']}次，受倒排表上限影响{stats['capped']}次；"
+              f"优化前预计{legacy_estimate / 3600:.1f}小时")
@@ -0,0 +1,222 @@
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from rdflib import URIRef
+from rdflib.namespace import RDF
+
+from RDFBatchLoader import clean_name, get_node_id
+from RDFStream import open_scratch_db
+
+
+def _file_part(name):
+    """文件名片段：只保留字母、数字、下划线及中文"""
+    return re.sub(r'[^a-zA-Z0-9_\u4e00-\u9fa5]', '_', name)
+
+
+class BulkImportCsvExporter:
+    """离线批量导入导出器：流式生成 neo4j-admin database import 所需的节点/关系CSV
+
+    节点按Label、关系按类型拆分文件，全局使用同一个ID空间。节点与关系的去重状态存放在
+    磁盘SQLite临时库中，内存中只保留各Label的属性列名与打开的文件句柄。
+    """
+
+    def __init__(self, output_dir, work_dir=None):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self._work_dir = work_dir or tempfile.mkdtemp(prefix="bulk_import_")
+        os.makedirs(self._work_dir, exist_ok=True)
+        self._db = open_scratch_db(os.path.join(self._work_dir, "state.db"), """
+            CREATE TABLE nodes (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+            CREATE TABLE rels (key TEXT PRIMARY KEY) WITHOUT ROWID;
+        """)
+        self._columns = {}  # Label → 属性列名（有序）
+        self._rel_files = {}  # 关系类型 → (文件句柄, csv writer, 行数)
+
+    # ---------------------- 增量写入 ----------------------
+    def add_node(self, node_key, label, props=None):
+        """登记节点（重复登记时合并属性，后写覆盖先写）"""
+        row = self._db.execute("SELECT value FROM nodes WHERE key = ?", (node_key,)).fetchone()
+        node = json.loads(row[0]) if row is not None else {"l": label, "p": {}}
+        if props:
+            node["p"].update(props)
+        self._db.execute("INSERT OR REPLACE INTO nodes VALUES (?, ?)",
+                         (node_key, json.dumps(node, ensure_ascii=False)))
+
+        columns = self._columns.setdefault(node["l"], [])
+        for prop in (props or {}):
+            if prop not in columns:
+                columns.append(prop)
+
+    def add_relationship(self, start_key, rel_type, end_key, props=None):
+        """写出一条关系（同起点、同类型、同终点的关系只保留一条）"""
+        dedup_key = f"{start_key}\x1f{rel_type}\x1f{end_key}"
+        if not self._db.execute("INSERT OR IGNORE INTO rels VALUES (?)", (dedup_key,)).rowcount:
+            return
+
+        entry = self._rel_files.get(rel_type)
+        if entry is None:
+            path = os.path.join(self.output_dir, f"rels_{_file_part(rel_type)}.csv")
+            f = open(path, "w", encoding="utf-8", newline="")
+            writer = csv.writer(f)
+            writer.writerow([":START_ID", ":END_ID", "uri", ":TYPE"])
+            entry = self._rel_files[rel_type] = [f, writer, 0]
+        entry[1].writerow([start_key, end_key, (props or {}).get("uri", ""), rel_type])
+        entry[2] += 1
+
+    # ---------------------- 数据源适配 ----------------------
+    def export_rdf(self, triples, label_of, predicate_names=None):
+        """RDF三元组 → CSV（节点ID为URI，与RDFBatchLoader的Label/id/uri约定一致）"""
+        predicate_names = dict(predicate_names or {})
+        for s, p, o in triples:
+            s_label = label_of(s)
+            s_props = {"id": get_node_id(s), "uri": str(s)}
+            if p == RDF.type:
+                self.add_node(str(s), s_label, s_props)
+                continue
+            p_name = predicate_names.get(p)
+            if p_name is None:
+                p_name = predicate_names[p] = clean_name(p)
+            if isinstance(o, URIRef):
+                self.add_node(str(s), s_label, s_props)
+                self.add_node(str(o), label_of(o), {"id": get_node_id(o), "uri": str(o)})
+                self.add_relationship(str(s), p_name, str(o), {"uri": str(p)})
+            else:
+                s_props[p_name] = str(o)
+                self.add_node(str(s), s_label, s_props)
+        return self.finish()
+
+    def export_triples(self, triples):
+        """(实体1, 关系, 实体2, 实体1类型, 实体2类型) 三元组 → CSV（节点ID为 类型:名称）"""
+        for s, p, o, s_type, o_type in triples:
+            s_key, o_key = f"{s_type}:{s}", f"{o_type}:{o}"
+            self.add_node(s_key, s_type, {"name": s})
+            self.add_node(o_key, o_type, {"name": o})
+            self.add_relationship(s_key, p.replace(" ", "_").replace("-", "_"), o_key)
+        return self.finish()
+
+    # ---------------------- 收尾 ----------------------
+    def finish(self):
+        """按Label写出节点文件，关闭关系文件，清理临时状态并返回清单"""
+        start = time.perf_counter()
+        node_files = {}
+        for label, columns in self._columns.items():
+            path = os.path.join(self.output_dir, f"nodes_{_file_part(label)}.csv")
+            f = open(path, "w", encoding="utf-8", newline="")
+            writer = csv.writer(f)
+            writer.writerow([":ID"] + columns + [":LABEL"])
+            node_files[label] = [f, writer, 0]
+
+        # 顺序扫描磁盘中的节点表，逐行写入对应Label的文件
+        for key, value in self._db.execute("SELECT key, value FROM nodes"):
+            node = json.loads(value)
+            entry = node_files[node["l"]]
+            entry[1].writerow([key]
+                              + [node["p"].get(c, "") for c in self._columns[node["l"]]]
+                              + [node["l"]])
+            entry[2] += 1
+
+        manifest = {"nodes": {}, "relationships": {}}
+        for label, (f, _, count) in node_files.items():
+            f.close()
+            manifest["nodes"][label] = {"file": f.name, "count": count}
+        for rel_type, (f, _, count) in self._rel_files.items():
+            f.close()
+            manifest["relationships"][rel_type] = {"file": f.name, "count": count}
+
+        self._db.close()
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+
+        manifest["command"] = " ".join(
+            ["neo4j-admin database import full", "--multiline-fields=true"]
+            + [f'--nodes="{v["file"]}"' for v in manifest["nodes"].values()]
+            + [f'--relationships="{v["file"]}"' for v in manifest["relationships"].values()]
+            + ["neo4j"])
+        with open(os.path.join(self.output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        node_total = sum(v["count"] for v in manifest["nodes"].values())
+        rel_total = sum(v["count"] for v in manifest["relationships"].values())
+        print(f"CSV导出完成：{node_total}个节点，{rel_total}条关系，写出节点文件耗时{time.perf_counter() - start:.2f}秒")
+        print(f"离线导入命令（需先停止数据库）：{manifest['command']}")
+        return manifest
+
+
+def validate_export(output_dir):
+    """校验导出文件：表头格式、节点ID全局唯一、关系两端节点均存在、每行列数与表头一致"""
+    errors = []
+    node_ids = set()
+    rel_files = []
+    for name in sorted(os.listdir(output_dir)):
+        path = os.path.join(output_dir, name)
+        if name.startswith("rels_") and name.endswith(".csv"):
+            rel_files.append(path)
+            continue
+        if not (name.startswith("nodes_") and name.endswith(".csv")):
+            continue
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            if header[0] != ":ID" or header[-1] != ":LABEL":
+                errors.append(f"{name}：节点表头应以:ID开头、:LABEL结尾，实际为{header}")
+            for row in reader:
+                if len(row) != len(header):
+                    errors.append(f"{name}：列数与表头不一致：{row}")
+                if row[0] in node_ids:
+                    errors.append(f"{name}：节点ID重复：{row[0]}")
+                node_ids.add(row[0])
+
+    for path in rel_files:
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            if header[:2] != [":START_ID", ":END_ID"] or header[-1] != ":TYPE":
+                errors.append(f"{os.path.basename(path)}：关系表头格式错误：{header}")
+            for row in reader:
+                if len(row) != len(header):
+                    errors.append(f"{os.path.basename(path)}：列数与表头不一致：{row}")
+                for node_id in row[:2]:
+                    if node_id not in node_ids:
+                        errors.append(f"{os.path.basename(path)}：关系端点不存在：{node_id}")
+    return errors
+
+
+# 使用小型样例数据校验导出结果
+if __name__ == "__main__":
+    from RDFStream import build_type_map, iter_triples
+
+    fixture_nt = """<http://example.org/books/1001> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://schema.org/Book> .
+<http://example.org/books/1001> <http://schema.org/name> "Neo4j图数据库, \\"实战\\"" .
+<http://example.org/books/1001> <http://schema.org/author> <http://example.org/people/2001> .
+<http://example.org/books/1001> <http://schema.org/author> <http://example.org/people/2001> .
+<http://example.org/people/2001> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://schema.org/Person> .
+<http://example.org/people/2001> <http://schema.org/name> "张三" .
+"""
+    fixture_triples = [
+        ("马云", "创始人", "阿里巴巴", "PER", "ORG"),
+        ("阿里巴巴", "位于", "杭州", "ORG", "LOC"),
+        ("杭州", "属于", "浙江省", "LOC", "LOC"),
+        ("马云", "创始人", "阿里巴巴", "PER", "ORG"),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        nt_path = os.path.join(tmp, "fixture.nt")
+        with open(nt_path, "w", encoding="utf-8") as f:
+            f.write(fixture_nt)
+        labels = build_type_map(nt_path, lambda t: t.split("/")[-1])
+        rdf_manifest = BulkImportCsvExporter(os.path.join(tmp, "rdf")).export_rdf(
+            iter_triples(nt_path), lambda uri: labels.get(uri, "Resource"))
+        assert validate_export(os.path.join(tmp, "rdf")) == []
+        assert rdf_manifest["nodes"]["Book"]["count"] == 1
+        assert rdf_manifest["nodes"]["Person"]["count"] == 1
+        assert rdf_manifest["relationships"]["author"]["count"] == 1
+
+        triple_manifest = BulkImportCsvExporter(os.path.join(tmp, "triples")).export_triples(fixture_triples)
+        assert validate_export(os.path.join(tmp, "triples")) == []
+        assert sum(v["count"] for v in triple_manifest["nodes"].values()) == 4
+        assert sum(v["count"] for v in triple_manifest["relationships"].values()) == 3
+    print("样例数据校验通过")
@@ -0,0 +1,45 @@
+import pandas as pd
+from sqlalchemy import text
+
+
+def iter_sql_chunks(engine, sql, chunksize=10000, params=None):
+    """服务端游标分块读取：stream_results=True 配合 pd.read_sql(chunksize)，内存中始终只有一个块"""
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for chunk in pd.read_sql(text(sql), conn, params=params, chunksize=chunksize):
+            yield chunk
+
+
+def chunk_to_rows(df):
+    """DataFrame块 → UNWIND参数行（numpy类型转为Python原生类型，NaN转为None）"""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+# 使用本地SQLite代替MySQL，校验分块读取的内存占用不随表规模增长
+if __name__ == "__main__":
+    import tracemalloc
+    from sqlalchemy import create_engine
+
+    def peak_memory(table_size, chunksize=1000):
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE employee (id INTEGER PRIMARY KEY, name TEXT, age INTEGER, dept_id INTEGER)"))
+            conn.execute(text("INSERT INTO employee VALUES (:id, :name, :age, :dept_id)"),
+                         [{"id": i, "name": f"员工{i}", "age": 20 + i % 40, "dept_id": i % 10}
+                          for i in range(table_size)])
+
+        tracemalloc.start()
+        total = 0
+        for chunk in iter_sql_chunks(engine, "SELECT id, name, age, dept_id FROM employee", chunksize):
+            rows = chunk_to_rows(chunk)
+            assert len(rows) <= chunksize and isinstance(rows[0]["id"], int)
+            total += len(rows)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        engine.dispose()
+        assert total == table_size
+        return peak
+
+    small, large = peak_memory(20000), peak_memory(200000)
+    print(f"峰值内存：2万行 {small / 1024:.0f} KB，20万行 {large / 1024:.0f} KB")
+    assert large < small * 2, "分块读取的峰值内存不应随表规模线性增长"
+    print("分块读取校验通过")
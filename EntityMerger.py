@@ -0,0 +1,202 @@
+import time
+
+from Neo4jBatchWriter import iter_batches
+from Neo4jSchemaManager import Neo4jSchemaManager
+
+
+class UnionFind:
+    """并查集：把两两对齐结果合并成簇（A≈B、B≈C → {A, B, C}）"""
+
+    def __init__(self):
+        self.parent = {}
+        self.order = {}  # 名称首次出现的顺序，簇内最早出现的名称作为标准名
+
+    def add(self, x):
+        if x not in self.parent:
+            self.parent[x] = x
+            self.order[x] = len(self.order)
+
+    def find(self, x):
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a, b):
+        self.add(a)
+        self.add(b)
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.order[rb] < self.order[ra]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+
+    def clusters(self):
+        """返回 [(标准名, [重复名称, ...])]，标准名为簇内最早出现的名称"""
+        groups = {}
+        for x in sorted(self.parent, key=self.order.get):
+            groups.setdefault(self.find(x), []).append(x)
+        return [(members[0], members[1:]) for members in groups.values() if len(members) > 1]
+
+
+def cluster_pairs(pairs):
+    """对齐名称对 [(名称1, 名称2, ...)] → [(标准名, [重复名称, ...])]"""
+    uf = UnionFind()
+    for pair in pairs:
+        uf.union(pair[0], pair[1])
+    return uf.clusters()
+
+
+class EntityMergeExecutor:
+    """批量实体合并：重复实体的全部出/入关系（任意类型）改连到标准实体，属性合并后删除重复实体
+
+    每批 batch_size 个（标准名, 重复名）在一个事务内完成：先查出本批重复实体涉及的关系类型，
+    再按类型各执行一条 UNWIND 语句迁移关系（关系类型不能作为参数，按类型生成语句），最后合并属性并删除。
+    关系迁移用MERGE，标准实体上已有的同类型同方向关系不会重复创建，原关系的属性合并到保留的关系上。
+    属性合并时标准实体已有的属性优先，重复实体的名称记入标准实体的aliases列表。
+    """
+
+    def __init__(self, driver, label, key="name", batch_size=1000, database=None):
+        self.driver = driver
+        self.label = label
+        self.key = key
+        self.batch_size = batch_size
+        self.database = database
+        self._queries = {}
+
+    def _match(self):
+        return (f"UNWIND $rows AS row\n"
+                f"MATCH (c:`{self.label}` {{`{self.key}`: row.canonical}})\n"
+                f"MATCH (d:`{self.label}` {{`{self.key}`: row.duplicate}})\n")
+
+    def _rewire_queries(self, rel_type):
+        """某一关系类型的出边、入边迁移语句（自环 d→d 迁移为 c→c）"""
+        if rel_type not in self._queries:
+            outgoing = self._match() + f"""
+                MATCH (d)-[r:`{rel_type}`]->(x)
+                WITH c, d, r, CASE WHEN x = d THEN c ELSE x END AS target
+                MERGE (c)-[nr:`{rel_type}`]->(target)
+                SET nr += properties(r)
+                DELETE r
+            """
+            incoming = self._match() + f"""
+                MATCH (x)-[r:`{rel_type}`]->(d)
+                WHERE x <> d
+                MERGE (x)-[nr:`{rel_type}`]->(c)
+                SET nr += properties(r)
+                DELETE r
+            """
+            self._queries[rel_type] = (outgoing, incoming)
+        return self._queries[rel_type]
+
+    def _merge_batch(self, tx, rows):
+        result = tx.run(f"""
+            UNWIND $names AS name
+            MATCH (d:`{self.label}` {{`{self.key}`: name}})-[r]-()
+            RETURN DISTINCT type(r) AS rel_type
+        """, names=[row["duplicate"] for row in rows])
+        rel_types = [record["rel_type"] for record in result]
+        for rel_type in rel_types:
+            for query in self._rewire_queries(rel_type):
+                tx.run(query, rows=rows).consume()
+        # 属性与别名按标准实体分组合并：同一标准实体的多个重复实体（A≈B≈C）在同一行内处理，
+        # 否则每行各自计算的别名列表会相互覆盖，只留下最后一个重复实体的名称
+        groups = {}
+        for row in rows:
+            groups.setdefault(row["canonical"], []).append(row["duplicate"])
+        summary = tx.run(f"""
+            UNWIND $groups AS group
+            MATCH (c:`{self.label}` {{`{self.key}`: group.canonical}})
+            UNWIND group.duplicates AS duplicate
+            MATCH (d:`{self.label}` {{`{self.key}`: duplicate}})
+            WITH c, collect(d) AS dups
+            WITH c, dups, properties(c) AS kept,
+                 reduce(acc = coalesce(c.aliases, []), d IN dups |
+                        acc + [d.`{self.key}`] + coalesce(d.aliases, [])) AS aliases
+            FOREACH (d IN dups | SET c += properties(d))
+            SET c += kept
+            SET c.aliases = aliases
+            FOREACH (d IN dups | DETACH DELETE d)
+        """, groups=[{"canonical": canonical, "duplicates": duplicates}
+                     for canonical, duplicates in groups.items()]).consume()
+        return summary.counters.nodes_deleted
+
+    def merge(self, pairs):
+        """合并对齐结果：pairs 为 [(名称1, 名称2, ...)]，先用并查集聚成簇再批量合并；返回统计信息"""
+        clusters = cluster_pairs(pairs)
+        rows = [{"canonical": canonical, "duplicate": duplicate}
+                for canonical, duplicates in clusters for duplicate in duplicates]
+        Neo4jSchemaManager(self.driver, self.database).ensure([(self.label, self.key)])
+
+        merged = 0
+        start = time.perf_counter()
+        with self.driver.session(database=self.database) as session:
+            for batch in iter_batches(rows, self.batch_size):
+                merged += session.execute_write(self._merge_batch, batch)
+        elapsed = time.perf_counter() - start
+        return {"clusters": len(clusters), "duplicates": len(rows), "merged": merged, "seconds": elapsed,
+                "merges_per_sec": merged / elapsed if elapsed > 0 else 0.0}
+
+
+# 基准测试（需要可写的Neo4j）：python EntityMerger.py [重复实体数]
+if __name__ == "__main__":
+    import random
+    import sys
+
+    from neo4j import GraphDatabase
+
+    from Neo4jBatchWriter import write_batches
+
+    NEO4J_CONFIG = {"uri": "bolt://localhost:7687", "auth": ("neo4j", "123456")}
+    LABEL = "BenchOrg"
+    REL_TYPES = ["投资", "控股", "合作", "供应"]
+    n_duplicates = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    # 合成数据：每个标准实体带1~3个重复实体（链式对齐 A≈B≈C），每个实体与随机Item节点有出、入关系
+    random.seed(0)
+    pairs, nodes, chains = [], [], []
+    while len(pairs) < n_duplicates:
+        chain = [f"org{len(nodes) + i}" for i in range(random.randint(2, 4))]
+        nodes.extend(chain)
+        chains.append(chain)
+        pairs.extend(zip(chain, chain[1:]))
+    pairs = pairs[:n_duplicates]
+    # 校验用：完整落在pairs中的三成员链 A≈B≈C
+    chain3 = next(chain for chain in chains[:-1] if len(chain) == 3)
+    n_items = max(1000, len(nodes) // 10)
+    rels = [{"org": org, "item": f"item{random.randrange(n_items)}", "type": random.choice(REL_TYPES),
+             "out": random.random() < 0.5} for org in nodes for _ in range(3)]
+
+    driver = GraphDatabase.driver(**NEO4J_CONFIG)
+    with driver.session() as session:
+        session.run(f"MATCH (n) WHERE n:`{LABEL}` OR n:BenchItem DETACH DELETE n").consume()
+    Neo4jSchemaManager(driver).ensure([(LABEL, "name"), ("BenchItem", "name")])
+    write_batches(driver, f"UNWIND $rows AS row CREATE (:`{LABEL}` {{name: row, source: 'bench'}})", nodes, 10000)
+    write_batches(driver, "UNWIND $rows AS row CREATE (:BenchItem {name: row})",
+                  [f"item{i}" for i in range(n_items)], 10000)
+    for rel_type in REL_TYPES:
+        for out in (True, False):
+            pattern = "(o)-[:`{0}`]->(i)" if out else "(i)-[:`{0}`]->(o)"
+            write_batches(driver, f"""
+                UNWIND $rows AS row
+                MATCH (o:`{LABEL}` {{name: row.org}}) MATCH (i:BenchItem {{name: row.item}})
+                CREATE {pattern.format(rel_type)}
+            """, [r for r in rels if r["type"] == rel_type and r["out"] == out], 10000)
+    print(f"合成图：{len(nodes)}个实体，{len(rels)}条关系，{n_duplicates}个重复实体")
+
+    stats = EntityMergeExecutor(driver, LABEL, batch_size=1000).merge(pairs)
+    print(f"合并{stats['merged']}个重复实体（{stats['clusters']}个簇），耗时{stats['seconds']:.1f}秒，"
+          f"{stats['merges_per_sec']:.0f} merges/sec")
+    with driver.session() as session:
+        remaining = session.run(f"MATCH (n:`{LABEL}`) RETURN count(n) AS n").single()["n"]
+        with_aliases = session.run(f"MATCH (n:`{LABEL}`) WHERE size(n.aliases) > 0 RETURN count(n) AS n").single()["n"]
+        chain_aliases = session.run(f"MATCH (n:`{LABEL}` {{name: $name}}) RETURN n.aliases AS aliases",
+                                    name=chain3[0]).single()["aliases"]
+    print(f"剩余{remaining}个实体（预期{len(nodes) - n_duplicates}），其中{with_aliases}个带别名")
+    # 三成员链合并后，标准实体的别名须包含两个重复实体
+    assert chain_aliases == chain3[1:], f"{chain3[0]}的别名为{chain_aliases}，预期{chain3[1:]}"
+    print(f"三成员链{chain3}：{chain3[0]}的别名{chain_aliases}")
+    driver.close()
@@ -0,0 +1,389 @@
+import json
+import os
+import shutil
+import time
+from array import array
+
+import numpy as np
+from scipy import sparse
+
+
+def _value_array(values):
+    """节点键/属性值 → 保存用的数组：同为str、int或float时用定长类型，否则用object数组（按pickle保存，保留各自的类型）"""
+    values = list(values)
+    if {type(value) for value in values} in ({str}, {int}, {float}):
+        return np.array(values)
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+class GraphSnapshot:
+    """从Neo4j流式读取的图快照：节点键字典编码为连续整数，邻接关系保存为scipy.sparse CSR矩阵
+
+    边按 (起点键, 终点键[, 权重]) 逐行读入紧凑数组（每条边16字节），首次访问matrix时一次性构建CSR并释放数组；
+    CSR中每条边只占 4字节列号 + 4字节权重（无向图两个方向各存一份）。
+    重复边与NetworkX一致：后读到的权重覆盖先读到的（无向图中 (a, b) 与 (b, a) 视为同一条边）。
+    需要NetworkX算法时再调用 to_networkx() 构建（结果缓存），只用邻接、度等信息时不必构建。
+    save()/load() 以.npy文件目录持久化，加载时CSR数组按内存映射读取；apply_delta() 在已有快照上增量更新。
+    """
+
+    def __init__(self, directed=False, weight_dtype=np.float32):
+        self.directed = directed
+        self.weight_dtype = weight_dtype
+        self.weighted = False  # 读入的边是否带权重列
+        self.index = {}  # 节点键 → 编号（插入顺序即编号顺序）
+        self.node_attrs = {}  # 属性名 → {编号: 值}
+        self.skipped = 0  # 键或权重为None而跳过的行数
+        self._src = array("i")
+        self._dst = array("i")
+        self._weight = array("d")
+        self._matrix = None
+        self._nodes = None
+        self._nx = None
+        self.fingerprint = None  # 构建快照时数据库的指纹（见 load_cached）
+
+    @classmethod
+    def from_neo4j(cls, runner, edge_query, node_queries=(), directed=False, **params):
+        """runner 为 py2neo 的 Graph 或 neo4j 的 Session（任何 run(query, **params) 返回可迭代记录的对象）
+
+        node_queries：[(查询, {常量属性})]，查询第一列为节点键，其余列按列名作为节点属性；
+        edge_query：返回 起点键, 终点键[, 权重] 两列或三列。
+        """
+        snapshot = cls(directed)
+        for query, attrs in node_queries:
+            snapshot.add_node_records(runner.run(query, **params), **attrs)
+        snapshot.add_edges(runner.run(edge_query, **params))
+        return snapshot
+
+    def _code(self, key):
+        code = self.index.get(key)
+        if code is None:
+            if self._matrix is not None:
+                raise RuntimeError("快照已构建，不能再加入新节点")
+            code = self.index[key] = len(self.index)
+        return code
+
+    def add_nodes(self, keys, **attrs):
+        """加入节点（可带统一的属性值，如 type="user"），键为None的跳过"""
+        for key in keys:
+            if key is None:
+                continue
+            code = self._code(key)
+            for name, value in attrs.items():
+                self.node_attrs.setdefault(name, {})[code] = value
+
+    def add_node_records(self, records, **attrs):
+        """按查询结果加入节点：第一列为键，其余非None的列作为属性"""
+        for record in records:
+            key = record[0]
+            if key is None:
+                continue
+            code = self._code(key)
+            for name, value in attrs.items():
+                self.node_attrs.setdefault(name, {})[code] = value
+            for name, value in zip(list(record.keys())[1:], list(record)[1:]):
+                if value is not None:
+                    self.node_attrs.setdefault(name, {})[code] = value
+
+    def add_edges(self, rows, delete_none=False):
+        """流式读入边：rows 的每一行为 (起点键, 终点键) 或 (起点键, 终点键, 权重)
+
+        delete_none=True 时权重为None的行表示删除该边（增量更新用），否则跳过。
+        """
+        if self._matrix is not None:
+            raise RuntimeError("快照已构建，不能再加入边")
+        code = self._code
+        src, dst, weight = self._src.append, self._dst.append, self._weight.append
+        for row in rows:
+            s, d = row[0], row[1]
+            if len(row) > 2:
+                w = row[2]
+                self.weighted = True
+            else:
+                w = 1.0
+            if w is None and delete_none:
+                w = np.nan
+            if s is None or d is None or w is None:
+                self.skipped += 1
+                continue
+            src(code(s))
+            dst(code(d))
+            weight(w)
+
+    @property
+    def nodes(self):
+        """编号 → 节点键"""
+        if self._nodes is None or len(self._nodes) != len(self.index):
+            self._nodes = list(self.index)
+        return self._nodes
+
+    @property
+    def matrix(self):
+        """CSR邻接矩阵（首次访问时构建，之后读入边的缓冲区被释放）"""
+        if self._matrix is None:
+            n = len(self.index)
+            src = np.frombuffer(self._src, dtype=np.int32)
+            dst = np.frombuffer(self._dst, dtype=np.int32)
+            weight = np.frombuffer(self._weight, dtype=np.float64)
+            if not self.directed:
+                src, dst = np.minimum(src, dst), np.maximum(src, dst)
+            # 重复边保留最后一次出现的权重
+            key = src.astype(np.int64) * n + dst
+            order = np.argsort(key, kind="stable")
+            key = key[order]
+            last = order[np.r_[key[1:] != key[:-1], True]] if len(key) else order
+            # 最后一次出现为删除标记（NaN）的边不保留
+            last = last[~np.isnan(weight[last])]
+            src, dst, weight = src[last], dst[last], weight[last].astype(self.weight_dtype)
+            if not self.directed:
+                off = src != dst
+                src, dst, weight = (np.concatenate([src, dst[off]]), np.concatenate([dst, src[off]]),
+                                    np.concatenate([weight, weight[off]]))
+            self._matrix = sparse.csr_matrix((weight, (src, dst)), shape=(n, n))
+            self._matrix.sort_indices()
+            self._src, self._dst, self._weight = array("i"), array("i"), array("d")
+        return self._matrix
+
+    def number_of_nodes(self):
+        return len(self.index)
+
+    def number_of_edges(self):
+        m = self.matrix
+        if self.directed:
+            return m.nnz
+        # 自环只存一份；按存储位置统计（权重为0的自环也计入）
+        rows = np.repeat(np.arange(m.shape[0], dtype=m.indices.dtype), np.diff(m.indptr))
+        return (m.nnz + int(np.count_nonzero(m.indices == rows))) // 2
+
+    def neighbors(self, key):
+        """节点的邻居键列表（有向图为后继）"""
+        m = self.matrix
+        code = self.index[key]
+        return [self.nodes[i] for i in m.indices[m.indptr[code]:m.indptr[code + 1]].tolist()]
+
+    def degree(self):
+        """各节点的邻居数（按编号顺序的数组，自环计1次）"""
+        return np.diff(self.matrix.indptr)
+
+    def memory_bytes(self):
+        """CSR矩阵占用的字节数（不含节点键本身）"""
+        m = self.matrix
+        return m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+
+    def _reopen(self):
+        """已构建的CSR重新展开为边数组，以便继续读入节点与边"""
+        if self._matrix is None:
+            return
+        coo = self._matrix.tocoo()
+        keep = slice(None) if self.directed else coo.row <= coo.col
+        self._src = array("i", coo.row[keep].astype(np.int32).tobytes())
+        self._dst = array("i", coo.col[keep].astype(np.int32).tobytes())
+        self._weight = array("d", coo.data[keep].astype(np.float64).tobytes())
+        self._matrix = None
+        self._nx = None
+
+    def apply_delta(self, rows=(), node_records=()):
+        """增量更新：node_records 为 [(节点记录, {常量属性})]；rows 中的边覆盖已有权重，权重为None的行删除该边"""
+        self._reopen()
+        for records, attrs in node_records:
+            self.add_node_records(records, **attrs)
+        self.add_edges(rows, delete_none=True)
+        return self
+
+    def save(self, path):
+        """保存到目录（每个数组一个.npy文件，先写临时目录再替换，中途失败不会损坏已有快照）"""
+        m = self.matrix
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "indptr.npy"), m.indptr)
+        np.save(os.path.join(tmp_path, "indices.npy"), m.indices)
+        np.save(os.path.join(tmp_path, "data.npy"), m.data)
+        np.save(os.path.join(tmp_path, "nodes.npy"), _value_array(self.nodes))
+        attrs = sorted(self.node_attrs)
+        for i, name in enumerate(attrs):
+            values = self.node_attrs[name]
+            np.save(os.path.join(tmp_path, f"attr{i}_codes.npy"), np.fromiter(values, dtype=np.int32, count=len(values)))
+            np.save(os.path.join(tmp_path, f"attr{i}_values.npy"), _value_array(values.values()))
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"directed": self.directed, "weighted": self.weighted, "attrs": attrs,
+                       "fingerprint": self.fingerprint}, f, ensure_ascii=False)
+        if os.path.exists(path):
+            old_path = f"{path}.old"
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path)
+        else:
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """从目录加载；mmap=True 时CSR数组按内存映射读取（只读，增量更新时才复制到内存）"""
+        mode = "r" if mmap else None
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode=mode)
+        indices = np.load(os.path.join(path, "indices.npy"), mmap_mode=mode)
+        data = np.load(os.path.join(path, "data.npy"), mmap_mode=mode)
+        snapshot = cls(meta["directed"], data.dtype.type)
+        snapshot.weighted = meta["weighted"]
+        snapshot.fingerprint = meta["fingerprint"]
+        nodes = np.load(os.path.join(path, "nodes.npy"), allow_pickle=True).tolist()
+        snapshot.index = {key: i for i, key in enumerate(nodes)}
+        for i, name in enumerate(meta["attrs"]):
+            codes = np.load(os.path.join(path, f"attr{i}_codes.npy")).tolist()
+            values = np.load(os.path.join(path, f"attr{i}_values.npy"), allow_pickle=True).tolist()
+            snapshot.node_attrs[name] = dict(zip(codes, values))
+        n = len(snapshot.index)
+        snapshot._matrix = sparse.csr_matrix((data, indices, indptr), shape=(n, n), copy=False)
+        return snapshot
+
+    def to_networkx(self):
+        """按需构建NetworkX图（节点顺序、节点属性与逐条add_node/add_edge构建的结果一致），结果缓存"""
+        if self._nx is None:
+            import networkx as nx
+            graph = nx.DiGraph() if self.directed else nx.Graph()
+            nodes = self.nodes
+            graph.add_nodes_from(nodes)
+            for name, values in self.node_attrs.items():
+                nx.set_node_attributes(graph, {nodes[code]: value for code, value in values.items()}, name)
+            coo = self.matrix.tocoo()
+            keep = slice(None) if self.directed else coo.row <= coo.col
+            rows = map(nodes.__getitem__, coo.row[keep].tolist())
+            cols = map(nodes.__getitem__, coo.col[keep].tolist())
+            if self.weighted:
+                graph.add_weighted_edges_from(zip(rows, cols, coo.data[keep].tolist()))
+            else:
+                graph.add_edges_from(zip(rows, cols))
+            self._nx = graph
+        return self._nx
+
+
+def _fingerprint(runner, query, **params):
+    """指纹查询的第一行 → 可JSON保存、可直接比较的字典"""
+    record = next(iter(runner.run(query, **params)), None)
+    if record is None:
+        return {}
+    return json.loads(json.dumps(dict(zip(record.keys(), record)), default=str))
+
+
+def _is_watermark(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def load_cached(path, runner, edge_query, node_queries=(), directed=False, fingerprint_query=None,
+                delta_edge_query=None, delta_node_queries=(), max_delta_ratio=0.1, mmap=True, **params):
+    """带磁盘缓存的快照加载，返回 (快照, 状态)，状态为 "reused"（直接用缓存）/ "delta"（增量更新）/ "full"（全量读取）
+
+    fingerprint_query 返回一行：edges（关系数）、nodes（节点数）、updated（节点与关系updated_at的最大值，毫秒时间戳），
+    其余列（如权重之和 sum(r.count)）一并比较，使只改权重、不改数量的写入也能改变指纹；
+    指纹与缓存相同时直接内存映射加载缓存；
+    指纹不同但变化较小时，只用delta查询（参数$since为缓存的updated）读取更新过的节点与边，合并到缓存后保存；
+    delta查询应使用 updated_at >= $since：与水位相同时间戳、晚提交的写入也会读到，重复的行按后读覆盖合并；
+    没有缓存、变化行数超过缓存边数的max_delta_ratio、节点数减少、或指纹变化了但updated没有增大、查不到任何变化行时
+    全量读取并保存。
+    updated 须为数值（如 timestamp() 的毫秒数）：为null（写入方没有维护updated_at）时不复用缓存，每次全量读取；
+    datetime等类型经JSON保存后无法再作为$since与库中的值比较，同样按全量处理。
+    增量依赖写入方在新增/修改节点与关系时设置updated_at（如 timestamp()）；删除关系应改为软删除（edges计入软删除的关系），
+    由delta查询返回权重null。关系数减少或其增加超过变化行数说明发生了硬删除，改为全量读取；
+    同时硬删除与新增同样多的关系时指纹无法发现，此时应删除缓存目录。
+    path 或 fingerprint_query 为None时不使用缓存。
+    """
+    use_cache = path is not None and fingerprint_query is not None
+    fingerprint = _fingerprint(runner, fingerprint_query, **params) if use_cache else None
+    if use_cache and os.path.exists(path):
+        cached = GraphSnapshot.load(path, mmap=mmap)
+        old = cached.fingerprint or {}
+        since, updated = old.get("updated"), fingerprint.get("updated")
+        if old == fingerprint and _is_watermark(updated):
+            return cached, "reused"
+        # updated没有增大说明有写入未设置updated_at，增量会漏掉这些变化
+        if delta_edge_query and _is_watermark(since) and _is_watermark(updated) and updated > since \
+                and fingerprint.get("nodes", 0) >= old.get("nodes", 0):
+            rows = list(runner.run(delta_edge_query, since=since, **params))
+            added = fingerprint.get("edges", 0) - old.get("edges", 0)
+            if 0 <= added <= len(rows) <= max_delta_ratio * max(old.get("edges", 0), 1):
+                node_records = [(list(runner.run(query, since=since, **params)), attrs)
+                                for query, attrs in delta_node_queries]
+                # 指纹变了却没有任何变化行（如updated_at未按约定维护），增量无从更新，全量读取
+                if rows or any(records for records, _ in node_records):
+                    cached.apply_delta(rows, node_records)
+                    cached.fingerprint = fingerprint
+                    cached.save(path)
+                    return cached, "delta"
+
+    snapshot = GraphSnapshot.from_neo4j(runner, edge_query, node_queries, directed, **params)
+    if use_cache:
+        snapshot.fingerprint = fingerprint
+        snapshot.save(path)
+    return snapshot, "full"
+
+
+# 基准测试：python GraphSnapshot.py [边数]，默认10000000（模拟记录流，不含Bolt网络传输与解码）
+if __name__ == "__main__":
+    import sys
+    import tracemalloc
+
+    import networkx as nx
+
+    n_edges = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    n_nodes = max(10, n_edges // 10)
+    rng = np.random.default_rng(0)
+    keys = [f"U{i}" for i in range(n_nodes)]
+
+    def records(n, chunk=1000000):
+        """模拟Neo4j返回的 (a.id, b.id, r.count) 记录流"""
+        for start in range(0, n, chunk):
+            size = min(chunk, n - start)
+            src = rng.integers(n_nodes, size=size).tolist()
+            dst = rng.integers(n_nodes, size=size).tolist()
+            count = rng.integers(1, 10, size=size).tolist()
+            yield from ((keys[s], keys[d], c) for s, d, c in zip(src, dst, count))
+
+    # 优化前后的内存对比（小规模，用tracemalloc统计）
+    sample = min(n_edges, 1000000)
+    tracemalloc.start()
+    start = time.perf_counter()
+    graph = nx.Graph()
+    for s, d, c in records(sample):
+        graph.add_weighted_edges_from([(s, d, c)])
+    nx_seconds = time.perf_counter() - start
+    nx_bytes = tracemalloc.get_traced_memory()[0]
+    del graph
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    snapshot = GraphSnapshot()
+    snapshot.add_edges(records(sample))
+    snapshot.matrix
+    csr_seconds = time.perf_counter() - start
+    csr_current, csr_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{sample}条边：优化前NetworkX逐条构建{nx_seconds:.1f}秒，{nx_bytes / sample:.0f}字节/边；"
+          f"优化后CSR {csr_seconds:.1f}秒，{csr_current / sample:.0f}字节/边（含节点键字典），"
+          f"构建峰值{csr_peak / sample:.0f}字节/边")
+
+    start = start_all = time.perf_counter()
+    snapshot = GraphSnapshot()
+    snapshot.add_edges(records(n_edges))
+    loaded = time.perf_counter()
+    snapshot.matrix
+    built = time.perf_counter()
+    print(f"{n_edges}条边、{snapshot.number_of_nodes()}个节点：读入{loaded - start:.1f}秒，构建CSR{built - loaded:.1f}秒；"
+          f"CSR {snapshot.memory_bytes() / 2 ** 20:.0f}MB，{snapshot.memory_bytes() / n_edges:.1f}字节/边")
+
+    # 磁盘缓存：保存、内存映射加载、1%的边变化时增量更新
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), "snapshot")
+    start = time.perf_counter()
+    snapshot.save(path)
+    saved = time.perf_counter() - start
+    start = time.perf_counter()
+    cached = GraphSnapshot.load(path)
+    cached.matrix.indptr[-1]
+    mapped = time.perf_counter() - start
+    start = time.perf_counter()
+    cached.apply_delta(records(n_edges // 100))
+    cached.matrix
+    delta = time.perf_counter() - start
+    print(f"缓存：保存{saved:.1f}秒，内存映射加载{mapped:.1f}秒（节点键字典重建占大部分）；"
+          f"{n_edges // 100}条边变化时增量更新{delta:.1f}秒（全量读取需{built - start_all:.1f}秒）")
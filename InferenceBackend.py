@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import torch
+
+# torch：fp32 PyTorch；int8：PyTorch动态int8量化；onnx / onnx-int8：导出ONNX后用onnxruntime推理（可选依赖）
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+
+# 转换后与fp32比对预测结果的样例语料
+FIXTURE_TEXTS = [
+    "马云于1999年创立阿里巴巴，公司总部位于杭州余杭区。",
+    "马化腾1998年创立腾讯，总部位于深圳南山区",
+    "华为技术有限公司成立于1987年，总部位于广东省深圳市龙岗区。",
+    "张勇曾任阿里巴巴集团董事局主席兼首席执行官。",
+    "苹果公司在美国加利福尼亚州库比蒂诺发布了新款iPhone。",
+    "马云[SEP]阿里巴巴[SEP]马云于1999年创立阿里巴巴，公司总部位于杭州余杭区。",
+    "阿里巴巴[SEP]杭州余杭区[SEP]马云于1999年创立阿里巴巴，公司总部位于杭州余杭区。",
+]
+
+
+class _Output:
+    def __init__(self, logits):
+        self.logits = logits
+
+
+class OnnxModel:
+    """onnxruntime推理会话的包装，调用方式与transformers模型一致：model(**inputs).logits"""
+
+    def __init__(self, path, config, num_threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.config = config
+        self._input_names = [i.name for i in self.session.get_inputs()]
+
+    def eval(self):
+        return self
+
+    def __call__(self, **inputs):
+        feed = {}
+        for name in self._input_names:
+            value = inputs.get(name)
+            # BERT的token_type_ids缺省时全为0
+            feed[name] = value.numpy() if value is not None else torch.zeros_like(inputs["input_ids"]).numpy()
+        return _Output(torch.from_numpy(self.session.run(None, feed)[0]))
+
+
+class _LogitsOnly(torch.nn.Module):
+    """导出ONNX用：只返回logits"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                          token_type_ids=token_type_ids).logits
+
+
+def source_fingerprint(model_dir, backend, **model_kwargs):
+    """源模型指纹：checkpoint中权重与配置文件的名称、大小、修改时间，加上推理后端与加载参数（如num_labels）
+
+    不读取权重内容，缓存命中时不必先构建fp32模型。checkpoint中没有的任务头（如从预训练底座加载的分类头）
+    须由调用方以固定随机种子初始化（见 ModelRegistry.get_model），同一指纹才对应同一组权重。
+    """
+    digest = hashlib.sha1(json.dumps({"backend": backend, "model_kwargs": model_kwargs},
+                                     sort_keys=True, default=str).encode("utf-8"))
+    for name in sorted(os.listdir(model_dir)):
+        if name.endswith((".safetensors", ".bin", ".json")):
+            stat = os.stat(os.path.join(model_dir, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _quantize_int8(model):
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _build(model, tokenizer, backend, artifact_dir):
+    """生成转换结果并写入artifact_dir（连同模型配置，ONNX加载时不必再构建fp32模型）"""
+    os.makedirs(artifact_dir, exist_ok=True)
+    model.config.save_pretrained(artifact_dir)
+    if backend == "int8":
+        # 保存整个量化后的模块，加载时不必先构建fp32模型再重新量化
+        torch.save(_quantize_int8(model), os.path.join(artifact_dir, "model_int8.pt"))
+        return
+
+    onnx_path = os.path.join(artifact_dir, "model.onnx")
+    sample = tokenizer(FIXTURE_TEXTS[:2], return_tensors="pt", padding=True)
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic_axes["logits"] = {0: "batch", 1: "sequence"} if model.config.architectures and \
+        model.config.architectures[0].endswith("TokenClassification") else {0: "batch"}
+    torch.onnx.export(_LogitsOnly(model).eval(), tuple(sample[name] for name in names), onnx_path,
+                      input_names=names, output_names=["logits"], dynamic_axes=dynamic_axes,
+                      opset_version=17, dynamo=False)
+    if backend == "onnx-int8":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(onnx_path, os.path.join(artifact_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+
+def _load(backend, artifact_dir, num_threads=None):
+    """从artifact_dir加载转换结果"""
+    if backend == "int8":
+        # 缓存由本模块生成，按完整模块反序列化
+        return torch.load(os.path.join(artifact_dir, "model_int8.pt"), weights_only=False).eval()
+    from transformers import AutoConfig
+    name = "model_int8.onnx" if backend == "onnx-int8" else "model.onnx"
+    return OnnxModel(os.path.join(artifact_dir, name), AutoConfig.from_pretrained(artifact_dir), num_threads)
+
+
+def _artifact_dir(model_dir, backend):
+    return f"{os.path.normpath(model_dir)}-{backend}"
+
+
+def _read_meta(artifact_dir):
+    meta_path = os.path.join(artifact_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _report(backend, report):
+    print(f"推理后端：{backend}（与fp32预测一致率{report['agreement']:.2%}，"
+          f"logits最大误差{report['max_abs_diff']:.4f}）")
+
+
+def load_cached_backend(model_dir, backend, min_agreement=0.99, num_threads=None, **model_kwargs):
+    """缓存的转换结果与源checkpoint指纹一致且通过一致率校验时直接加载（不构建fp32模型），否则返回None"""
+    if backend == "torch":
+        return None
+    artifact_dir = _artifact_dir(model_dir, backend)
+    meta = _read_meta(artifact_dir)
+    if meta is None or meta.get("source") != source_fingerprint(model_dir, backend, **model_kwargs) \
+            or meta["verification"]["agreement"] < min_agreement:
+        return None
+    candidate = _load(backend, artifact_dir, num_threads)
+    _report(backend, meta["verification"])
+    return candidate
+
+
+def verify(reference, candidate, tokenizer, texts=FIXTURE_TEXTS, min_agreement=0.99, max_length=128):
+    """在样例语料上比对候选模型与fp32模型：预测一致率（token分类按有效token统计）与logits最大绝对误差"""
+    inputs = tokenizer(list(texts), return_tensors="pt", padding=True, truncation=True, max_length=max_length)
+    with torch.inference_mode():
+        expected = reference(**inputs).logits
+        actual = candidate(**inputs).logits
+    if expected.dim() == 3:
+        mask = inputs["attention_mask"].bool()
+        expected, actual = expected[mask], actual[mask]
+    agreement = (expected.argmax(dim=-1) == actual.argmax(dim=-1)).float().mean().item()
+    return {"agreement": agreement, "max_abs_diff": (expected - actual).abs().max().item(),
+            "passed": agreement >= min_agreement}
+
+
+def prepare_backend(model, tokenizer, model_dir, backend="torch", min_agreement=0.99, num_threads=None,
+                    **model_kwargs):
+    """把已加载的fp32模型切换到指定推理后端，返回调用方式相同的模型对象
+
+    转换结果缓存在模型目录旁的 <model_dir>-<backend>/ 中，按源checkpoint的指纹（model_kwargs为加载模型时的参数）校验，
+    checkpoint不变时直接复用（先用 load_cached_backend 尝试，命中时不必构建fp32模型）；
+    转换时先写入本进程的临时目录，在样例语料上与fp32比对后再整体替换缓存目录，多个进程同时转换不会读到写了一半的文件。
+    一致率低于min_agreement则打印警告并继续使用fp32。
+    """
+    if backend == "torch":
+        return model
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的推理后端：{backend}，可选：{BACKENDS}")
+
+    model.eval()
+    artifact_dir = _artifact_dir(model_dir, backend)
+    source = source_fingerprint(model_dir, backend, **model_kwargs)
+    meta = _read_meta(artifact_dir)
+    candidate = None
+    if meta is None or meta.get("source") != source:
+        start = time.perf_counter()
+        build_dir = f"{artifact_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(build_dir, ignore_errors=True)
+        _build(model, tokenizer, backend, build_dir)
+        candidate = _load(backend, build_dir, num_threads)
+        meta = {"source": source, "backend": backend,
+                "verification": verify(model, candidate, tokenizer, min_agreement=min_agreement)}
+        with open(os.path.join(build_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        # 候选模型已读入内存，替换目录不影响本进程；其他进程同时替换时以后完成的为准
+        shutil.rmtree(artifact_dir, ignore_errors=True)
+        try:
+            os.replace(build_dir, artifact_dir)
+        except OSError:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        print(f"已生成{backend}推理模型：{artifact_dir}，耗时{time.perf_counter() - start:.2f}秒")
+
+    # 一致率在首次转换时计算并缓存，阈值在每次加载时比较
+    report = meta["verification"]
+    if report["agreement"] < min_agreement:
+        print(f"警告：{backend}推理结果与fp32的一致率为{report['agreement']:.2%}，"
+              f"低于{min_agreement:.0%}，继续使用fp32")
+        return model
+    _report(backend, report)
+    return candidate if candidate is not None else _load(backend, artifact_dir, num_threads)
+
+
+# 各后端吞吐量与一致率对比：python InferenceBackend.py [模型目录] [token|sequence]
+if __name__ == "__main__":
+    import sys
+    from transformers import AutoModelForSequenceClassification, AutoModelForTokenClassification, AutoTokenizer
+
+    MODEL_PATH = sys.argv[1] if len(sys.argv) > 1 else "./models/bert-base-chinese-ner"
+    TASK = sys.argv[2] if len(sys.argv) > 2 else "token"
+    model_cls = AutoModelForTokenClassification if TASK == "token" else AutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH, local_files_only=True)
+    fp32 = model_cls.from_pretrained(MODEL_PATH, local_files_only=True).eval()
+    corpus = FIXTURE_TEXTS * 32
+    inputs = tokenizer(corpus, return_tensors="pt", padding=True, truncation=True, max_length=128)
+    for backend in BACKENDS:
+        candidate = prepare_backend(fp32, tokenizer, MODEL_PATH, backend, min_agreement=0.0)
+        start = time.perf_counter()
+        with torch.inference_mode():
+            for i in range(0, len(corpus), 16):
+                candidate(**{name: value[i:i + 16] for name, value in inputs.items()})
+        rate = len(corpus) / (time.perf_counter() - start)
+        report = verify(fp32, candidate, tokenizer)
+        print(f"{backend:>9}：{rate:.1f} texts/sec，预测一致率{report['agreement']:.2%}，"
+              f"logits最大误差{report['max_abs_diff']:.4f}")
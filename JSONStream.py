@@ -0,0 +1,71 @@
+import json
+
+from RDFStream import open_text
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+def _iter_array(f, first, read_size):
+    """增量解析顶层JSON数组：缓冲区中每凑齐一个完整元素就产出，内存上限约为单个元素大小"""
+    buf = first
+    eof = False
+    pos = buf.index("[") + 1
+    while True:
+        # 跳过空白与逗号，定位到下一个元素或数组结尾
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE + ",":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(read_size), 0
+            eof = not buf
+        if pos >= len(buf):
+            raise ValueError("JSON数组未正常结束")
+        if buf[pos] == "]":
+            return
+
+        try:
+            item, end = _DECODER.raw_decode(buf, pos)
+            # 元素恰好停在缓冲区末尾时可能被截断（如数字），补读后重新解析
+            complete = end < len(buf) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if complete:
+            yield item
+            pos = end
+            continue
+
+        chunk = f.read(read_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def iter_json_records(path, read_size=1 << 20):
+    """流式读取JSON数组或JSONL文件（支持.gz），逐条产出记录，不把整个文件读入内存
+
+    文件首个非空白字符为 [ 时按JSON数组解析，否则按每行一个JSON对象解析。
+    """
+    with open_text(path) as f:
+        first = f.read(read_size)
+        head = first.lstrip()
+        while not head and first:
+            first = f.read(read_size)
+            head = first.lstrip()
+        if head.startswith("["):
+            yield from _iter_array(f, first, read_size)
+            return
+
+        pending = ""
+        while first:
+            lines = (pending + first).split("\n")
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+            first = f.read(read_size)
+        if pending.strip():
+            yield json.loads(pending)
@@ -0,0 +1,221 @@
+import os
+import time
+import zlib
+
+import numpy as np
+
+from EntityAligner import normalize_name
+
+_PRIME = np.uint64(4294967311)  # 大于2^32的最小素数
+_MASK = np.uint64(0xFFFFFFFF)
+_BAND_MUL = np.uint64(0x9E3779B97F4A7C15)
+
+
+class MinHashLSHIndex:
+    """实体名近似重复索引：字符shingle的MinHash签名 + LSH分桶，可持久化并增量插入
+
+    签名共 num_perm = bands * rows 个值，两个名称在任一band上的rows个值全部相同即成为候选，
+    Jaccard相似度约高于 (1/bands)^(1/rows) 的名称大概率被召回。
+    分桶表分两部分：保存/加载时整体排序的数组（按band二分查找），以及加载后新插入名称的字典，
+    因此加载不需要逐条重建，新名称也可随时插入；save() 时把新插入部分合并进排序数组。
+
+    "有限公司""科技"等高频片段会让大量无关名称落入同一个桶，build() 在初始名称集上统计shingle的文档频率，
+    超过max_df比例的shingle不参与签名（停用表随索引保存，之后插入与查询都沿用）。
+    """
+
+    def __init__(self, num_perm=64, bands=16, ngram=2, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm必须是bands的整数倍")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # a、b取32位以内，a * 哈希值 + b 不超出uint64
+        self._a = rng.integers(1, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self.names = []
+        self._ids = {}  # 名称 → 编号
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._size = 0
+        self._band_hashes = np.empty((bands, 0), dtype=np.uint64)  # 每个band内按哈希排序
+        self._band_ids = np.empty((bands, 0), dtype=np.int32)
+        self._delta = [dict() for _ in range(bands)]  # 排序数组之后新插入的名称：band哈希 → [编号]
+        self._stop = frozenset()  # 不参与签名的高频shingle哈希
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def _shingles(self, name):
+        """名称 → 字符n-gram的32位哈希（crc32，跨进程稳定）"""
+        text = normalize_name(name) or name
+        grams = {zlib.crc32(text[i:i + self.ngram].encode("utf-8"))
+                 for i in range(max(1, len(text) - self.ngram + 1))}
+        # 全部为高频shingle时保留原集合
+        return list(grams - self._stop or grams)
+
+    @classmethod
+    def build(cls, names, max_df=0.005, min_count=20, **kwargs):
+        """在初始名称集上统计高频shingle作为停用表，再插入全部名称"""
+        index = cls(**kwargs)
+        names = list(names)
+        df = {}
+        for name in names:
+            for h in index._shingles(name):
+                df[h] = df.get(h, 0) + 1
+        limit = max(min_count, max_df * len(names))
+        index._stop = frozenset(h for h, count in df.items() if count > limit)
+        index.add_many(names)
+        return index
+
+    def signatures(self, names, chunk=5000):
+        """批量计算MinHash签名：同一块名称的shingle拼接后一次完成全部置换，再按名称分段取最小值"""
+        result = np.empty((len(names), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(names), chunk):
+            shingles = [self._shingles(name) for name in names[start:start + chunk]]
+            lengths = np.fromiter((len(s) for s in shingles), dtype=np.int64, count=len(shingles))
+            values = np.fromiter((h for s in shingles for h in s), dtype=np.uint64, count=int(lengths.sum()))
+            hashed = ((self._a * values + self._b) % _PRIME) & _MASK
+            offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+            result[start:start + len(shingles)] = np.minimum.reduceat(hashed, offsets, axis=1).T
+        return result
+
+    def _band_keys(self, signatures):
+        """签名 (n, num_perm) → 每个band一个64位哈希 (n, bands)"""
+        values = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        keys = np.zeros((len(signatures), self.bands), dtype=np.uint64)
+        for r in range(self.rows):
+            keys = keys * _BAND_MUL + values[:, :, r]
+        return keys
+
+    def _append_signatures(self, signatures):
+        needed = self._size + len(signatures)
+        if needed > len(self._signatures):
+            grown = np.empty((max(needed, 2 * len(self._signatures), 1024), self.num_perm), dtype=np.uint32)
+            grown[:self._size] = self._signatures[:self._size]
+            self._signatures = grown
+        self._signatures[self._size:needed] = signatures
+        self._size = needed
+
+    def add(self, name):
+        """插入单个名称，返回其编号（已存在时直接返回）"""
+        return self.add_many([name])[0]
+
+    def add_many(self, names):
+        """批量插入名称（写入新插入部分的字典，save() 时合并），返回编号列表"""
+        ids = []
+        new_names = []
+        for name in names:
+            if name not in self._ids:
+                self._ids[name] = len(self.names)
+                self.names.append(name)
+                new_names.append(name)
+            ids.append(self._ids[name])
+        if new_names:
+            signatures = self.signatures(new_names)
+            first = self._size
+            self._append_signatures(signatures)
+            for offset, keys in enumerate(self._band_keys(signatures).tolist()):
+                for band, key in enumerate(keys):
+                    self._delta[band].setdefault(key, []).append(first + offset)
+        return ids
+
+    def _candidate_ids(self, signature):
+        keys = self._band_keys(signature[None, :])[0]
+        found = set()
+        for band, key in enumerate(keys):
+            hashes = self._band_hashes[band]
+            lo = np.searchsorted(hashes, key, side="left")
+            hi = np.searchsorted(hashes, key, side="right")
+            if hi > lo:
+                found.update(self._band_ids[band, lo:hi].tolist())
+            found.update(self._delta[band].get(int(key), ()))
+        return found
+
+    def query(self, name, min_jaccard=0.0, exclude_self=True):
+        """查询可能重复的已有名称，返回按估计Jaccard相似度降序的 [(名称, 估计相似度)]"""
+        signature = self.signatures([name])[0]
+        ids = self._candidate_ids(signature)
+        if exclude_self and name in self._ids:
+            ids.discard(self._ids[name])
+        if not ids:
+            return []
+        ids = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        jaccard = (self._signatures[ids] == signature).mean(axis=1)
+        order = np.argsort(-jaccard, kind="stable")
+        return [(self.names[i], float(j)) for i, j in zip(ids[order].tolist(), jaccard[order].tolist())
+                if j >= min_jaccard]
+
+    def _rebuild(self):
+        """把全部签名的band哈希整体排序，清空新插入部分"""
+        keys = self._band_keys(self._signatures[:self._size]).T
+        order = np.argsort(keys, axis=1, kind="stable")
+        self._band_hashes = np.take_along_axis(keys, order, axis=1)
+        self._band_ids = order.astype(np.int32)
+        self._delta = [dict() for _ in range(self.bands)]
+
+    def save(self, path):
+        """保存到.npz文件（先写临时文件再替换，中途失败不会损坏已有索引）"""
+        self._rebuild()
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, names=np.array(self.names, dtype=str), signatures=self._signatures[:self._size],
+                 band_hashes=self._band_hashes, band_ids=self._band_ids,
+                 stop=np.array(sorted(self._stop), dtype=np.uint32),
+                 params=np.array([self.num_perm, self.bands, self.ngram, self.seed]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            num_perm, bands, ngram, seed = data["params"].tolist()
+            index = cls(num_perm, bands, ngram, seed)
+            index.names = data["names"].tolist()
+            index._signatures = data["signatures"]
+            index._band_hashes = data["band_hashes"]
+            index._band_ids = data["band_ids"]
+            index._stop = frozenset(data["stop"].tolist())
+        index._size = len(index.names)
+        index._ids = {name: i for i, name in enumerate(index.names)}
+        return index
+
+    @classmethod
+    def open(cls, path, **kwargs):
+        """索引文件存在时加载，否则新建"""
+        return cls.load(path) if os.path.exists(path) else cls(**kwargs)
+
+
+# 基准测试：python MinHashIndex.py [已有名称数]
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    from EntityAligner import make_org_names
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    names = make_org_names(n + 1000)
+    existing, arriving = names[:n], names[n:]
+
+    start = time.perf_counter()
+    index = MinHashLSHIndex.build(existing)
+    print(f"构建{n}个名称的索引：{time.perf_counter() - start:.1f}秒")
+
+    path = os.path.join(tempfile.mkdtemp(), "org_lsh.npz")
+    start = time.perf_counter()
+    index.save(path)
+    saved = time.perf_counter() - start
+    start = time.perf_counter()
+    index = MinHashLSHIndex.load(path)
+    print(f"保存{saved:.1f}秒（{os.path.getsize(path) / 2 ** 20:.0f}MB），加载{time.perf_counter() - start:.1f}秒")
+
+    start = time.perf_counter()
+    found = sum(bool(index.query(name, min_jaccard=0.5)) for name in arriving)
+    query_ms = (time.perf_counter() - start) / len(arriving) * 1000
+    start = time.perf_counter()
+    for name in arriving:
+        index.add(name)
+    insert_ms = (time.perf_counter() - start) / len(arriving) * 1000
+    print(f"新名称{len(arriving)}个：查询{query_ms:.3f}毫秒/个（{found}个找到候选），插入{insert_ms:.3f}毫秒/个")
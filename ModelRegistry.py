@@ -0,0 +1,220 @@
+import os
+import shutil
+import threading
+import time
+
+# 只从本地目录加载模型，不访问（镜像）模型仓库
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import torch
+
+from InferenceBackend import load_cached_backend, prepare_backend
+
+MODEL_ROOT = "./models"
+# 逻辑名称 → 本地目录（相对MODEL_ROOT）与任务类型
+MODEL_SPECS = {
+    "ner": {"path": "bert-base-chinese-ner", "task": "token"},
+    "re": {"path": "bert-base-chinese", "task": "sequence"},
+}
+
+HEAD_INIT_SEED = 0  # 未训练任务头的初始化种子
+
+_settings = {"model_root": MODEL_ROOT, "backend": "torch", "num_threads": None, "safetensors": True}
+_models = {}  # (名称, 后端, 额外参数) → (tokenizer, model)，每个进程各一份
+_engines = {}
+_lock = threading.RLock()
+load_count = 0  # 本进程实际加载模型的次数
+
+
+def configure(model_root=None, backend=None, num_threads=None, safetensors=None):
+    """设置本进程的模型目录、默认推理后端、PyTorch线程数及是否转存safetensors（在首次加载前调用）"""
+    if model_root is not None:
+        _settings["model_root"] = model_root
+    if backend is not None:
+        _settings["backend"] = backend
+    if safetensors is not None:
+        _settings["safetensors"] = safetensors
+    if num_threads:
+        _settings["num_threads"] = num_threads
+        torch.set_num_threads(num_threads)
+
+
+def model_path(name):
+    return os.path.join(_settings["model_root"], MODEL_SPECS[name]["path"])
+
+
+def _model_class(task):
+    from transformers import AutoModelForSequenceClassification, AutoModelForTokenClassification
+    return AutoModelForTokenClassification if task == "token" else AutoModelForSequenceClassification
+
+
+def ensure_safetensors(path):
+    """权重只有pytorch_model.bin时一次性转存为safetensors，之后加载按mmap方式读取，不再整体反序列化；返回加载用的目录
+
+    转换的是源checkpoint本身（而不是加载了任务头的模型），结果写入模型目录旁的 <path>-safetensors/，源目录不做改动。
+    先写入本进程的临时目录再整体改名，多个进程同时转换也不会读到写了一半的文件；进程池应在启动worker前先调用一次。
+    """
+    files = os.listdir(path) if os.path.isdir(path) else []
+    if any(name.endswith(".safetensors") for name in files) or "pytorch_model.bin" not in files:
+        return path
+    source = os.path.join(path, "pytorch_model.bin")
+    cache_dir = f"{os.path.normpath(path)}-safetensors"
+    target = os.path.join(cache_dir, "model.safetensors")
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+        return cache_dir
+
+    from safetensors.torch import save_file
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.copytree(path, tmp_dir, ignore=shutil.ignore_patterns("pytorch_model.bin"))
+    state_dict = torch.load(source, map_location="cpu", weights_only=True)
+    # safetensors不接受共享存储的张量（如绑定的词向量），各自复制一份
+    save_file({name: tensor.contiguous().clone() for name, tensor in state_dict.items()},
+              os.path.join(tmp_dir, "model.safetensors"), metadata={"format": "pt"})
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    try:
+        os.replace(tmp_dir, cache_dir)
+    except OSError:
+        # 其他进程已先完成转换
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    print(f"已将{path}的权重转存为safetensors：{cache_dir}")
+    return cache_dir
+
+
+def get_model(name, backend=None, **model_kwargs):
+    """返回 (tokenizer, model)：首次调用时从本地目录加载，之后直接返回本进程内的同一实例"""
+    global load_count
+    backend = backend or _settings["backend"]
+    key = (name, backend, tuple(sorted(model_kwargs.items())))
+    with _lock:
+        if key in _models:
+            return _models[key]
+
+        from transformers import AutoTokenizer
+        path = model_path(name)
+        if not os.path.exists(os.path.join(path, "config.json")):
+            raise FileNotFoundError(
+                f"本地模型不存在：{path}。请先在可联网的环境中下载，例如："
+                f"AutoModelForTokenClassification.from_pretrained('ckiplab/bert-base-chinese-ner').save_pretrained('{path}')")
+
+        start = time.perf_counter()
+        load_path = ensure_safetensors(path) if _settings["safetensors"] else path
+        tokenizer = AutoTokenizer.from_pretrained(load_path, local_files_only=True)
+        # 已有与源checkpoint一致的int8/ONNX转换结果时直接加载，不再构建fp32模型
+        model = load_cached_backend(path, backend, num_threads=_settings["num_threads"], **model_kwargs)
+        if model is None:
+            # checkpoint中没有的任务头（如RE的分类头）以固定种子初始化：各进程、各次启动得到同一组权重，
+            # 转换结果的缓存（按checkpoint文件校验）因此保持有效
+            with torch.random.fork_rng():
+                torch.manual_seed(HEAD_INIT_SEED)
+                model = _model_class(MODEL_SPECS[name]["task"]).from_pretrained(
+                    load_path, local_files_only=True, low_cpu_mem_usage=True, **model_kwargs).eval()
+            model = prepare_backend(model, tokenizer, path, backend, num_threads=_settings["num_threads"],
+                                    **model_kwargs)
+        load_count += 1
+        print(f"[pid {os.getpid()}] 已加载模型{name}（{path}，{backend}），耗时{time.perf_counter() - start:.2f}秒")
+        _models[key] = (tokenizer, model)
+        return _models[key]
+
+
+def get_ner_engine(backend=None, **engine_kwargs):
+    """本进程共享的NER推理引擎（同一组参数只创建一次）"""
+    from NEREngine import NEREngine
+    key = ("ner", backend, tuple(sorted(engine_kwargs.items())))
+    with _lock:
+        if key not in _engines:
+            tokenizer, model = get_model("ner", backend)
+            _engines[key] = NEREngine(tokenizer, model, **engine_kwargs)
+        return _engines[key]
+
+
+def get_re_engine(rel_labels, backend=None, **engine_kwargs):
+    """本进程共享的关系抽取引擎（同一组参数只创建一次）"""
+    from REEngine import REEngine
+    key = ("re", backend, tuple(rel_labels), repr(sorted(engine_kwargs.items())))
+    with _lock:
+        if key not in _engines:
+            tokenizer, model = get_model("re", backend, num_labels=len(rel_labels))
+            _engines[key] = REEngine(tokenizer, model, rel_labels, **engine_kwargs)
+        return _engines[key]
+
+
+def init_worker(num_threads=1, model_root=None, backend=None, preload=("ner",)):
+    """进程池initializer：每个worker进程设置线程数并预先加载一次模型，之后的任务直接复用"""
+    configure(model_root=model_root, backend=backend, num_threads=num_threads)
+    for name in preload:
+        get_model(name)
+
+
+def _task_reload(text):
+    """基准测试任务（优化前）：每个任务各自加载模型"""
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+    from NEREngine import NEREngine
+    path = model_path("ner")
+    engine = NEREngine(AutoTokenizer.from_pretrained(path), AutoModelForTokenClassification.from_pretrained(path))
+    engine.extract(text)
+    return os.getpid(), 1
+
+
+def _task_registry(text):
+    """基准测试任务（优化后）：复用worker进程内已加载的模型"""
+    get_ner_engine().extract(text)
+    return os.getpid(), load_count
+
+
+# 冷启动耗时对比：python ModelRegistry.py [模型根目录]
+if __name__ == "__main__":
+    import json
+    import subprocess
+    import sys
+    from concurrent.futures import ProcessPoolExecutor
+
+    root = sys.argv[1] if len(sys.argv) > 1 else MODEL_ROOT
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def run_cold(load_code):
+        """在新进程中执行，分别计时import与模型加载"""
+        code = f"""
+import json, sys, time
+sys.path.insert(0, {here!r})
+start = time.perf_counter()
+from transformers import AutoTokenizer, AutoModelForTokenClassification, AutoModelForSequenceClassification
+import ModelRegistry
+imported = time.perf_counter()
+{load_code}
+print(json.dumps([imported - start, time.perf_counter() - imported]))
+"""
+        result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    ner_path, re_path = os.path.join(root, MODEL_SPECS["ner"]["path"]), os.path.join(root, MODEL_SPECS["re"]["path"])
+    # 优化前：导入时同时加载NER与RE模型
+    before = run_cold(f"""
+AutoTokenizer.from_pretrained({ner_path!r})
+AutoModelForTokenClassification.from_pretrained({ner_path!r})
+AutoTokenizer.from_pretrained({re_path!r})
+AutoModelForSequenceClassification.from_pretrained({re_path!r}, num_labels=4)
+""")
+    # 优化后：离线加载、safetensors（mmap），加载同样的NER与RE模型（转存在计时前完成）
+    for path in (ner_path, re_path):
+        ensure_safetensors(path)
+    after = run_cold(f"""
+ModelRegistry.configure(model_root={root!r})
+ModelRegistry.get_model("ner")
+ModelRegistry.get_model("re", num_labels=4)
+""")
+    print(f"冷启动（新进程）：import {before[0]:.2f}秒；模型加载 优化前{before[1]:.2f}秒，优化后{after[1]:.2f}秒")
+
+    # 进程池：优化前每个任务加载一次模型，优化后每个worker只加载一次（父进程先导入transformers，fork出的worker直接继承）
+    from transformers import AutoModelForTokenClassification, AutoTokenizer  # noqa: F401
+    workers, tasks = 4, 32
+    texts = ["马云于1999年创立阿里巴巴，公司总部位于杭州余杭区。"] * tasks
+    for name, task, initializer, initargs in (("优化前", _task_reload, configure, (root,)),
+                                              ("优化后", _task_registry, init_worker, (1, root))):
+        start = time.perf_counter()
+        with ProcessPoolExecutor(workers, initializer=initializer, initargs=initargs) as pool:
+            results = list(pool.map(task, texts))
+        loads = sum(n for n in {pid: n for pid, n in results}.values()) if task is _task_registry \
+            else len(results)
+        print(f"{name}：{workers}个worker处理{tasks}个任务，加载模型{loads}次，耗时{time.perf_counter() - start:.2f}秒")
@@ -0,0 +1,262 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from typing import NamedTuple
+
+import numpy as np
+import torch
+
+
+class Entity(NamedTuple):
+    """实体：文本、类型，以及在原文中的字符区间 [start, end)"""
+    text: str
+    type: str
+    start: int
+    end: int
+
+
+def build_label_tables(label_map):
+    """标签映射 → (实体开始, 实体延续, 实体结束, 实体类型) 四张按标签id索引的查找表，兼容BIO与BIOES"""
+    size = max(int(i) for i in label_map) + 1
+    is_begin = np.zeros(size, dtype=bool)
+    is_inside = np.zeros(size, dtype=bool)
+    is_end = np.zeros(size, dtype=bool)
+    types = [""] * size
+    for i, label in label_map.items():
+        i = int(i)
+        prefix = label.split("-", 1)[0]
+        is_begin[i] = prefix in ("B", "S")
+        is_inside[i] = prefix in ("I", "E")
+        is_end[i] = prefix in ("E", "S")
+        types[i] = label.split("-", 1)[1] if "-" in label else label
+    return is_begin, is_inside, is_end, types
+
+
+def decode_bio_spans(label_ids, offsets, doc_ids, label_tables):
+    """向量化BIO/BIOES解码：一次处理整批（多个文本首尾相接）的token，不逐token循环
+
+    label_ids/doc_ids 为每个正文token的预测标签与所属文本，offsets 为 (N, 2) 字符区间。
+    B-/S-开头=实体开始，其后的I-/E-为实体内部（E-/S-之后实体结束），其余标签或换到下一个文本时实体结束；
+    没有B-引导的I-被忽略。返回实体的 (所属文本, 首标签id, 起始字符, 结束字符) 四个数组。
+    """
+    is_begin, is_inside, is_end, _ = label_tables
+    continues = is_inside[label_ids]
+    continues[1:] &= (doc_ids[1:] == doc_ids[:-1]) & ~is_end[label_ids[:-1]]
+    if len(continues):
+        continues[0] = False
+    # 每个不能延续前一token的位置开启一个新片段，片段首token为实体开始时整个片段构成一个实体
+    heads = np.flatnonzero(~continues)
+    tails = np.append(heads[1:], len(label_ids)) - 1
+    entity = is_begin[label_ids[heads]]
+    heads, tails = heads[entity], tails[entity]
+    return doc_ids[heads], label_ids[heads], offsets[heads, 0], offsets[tails, 1]
+
+
+class NEREngine:
+    """批量NER推理引擎：按长度排序后动态padding组批，inference_mode下推理，结果按文本哈希做LRU缓存
+
+    extract_batch 接受列表或任意可迭代对象，返回与输入顺序一致的实体列表；重复文本只推理一次。
+    超过max_length的文本按滑动窗口切分（相邻窗口重叠stride个token），同一文本的全部窗口在同一批内推理，
+    重叠区的预测以中点为界分别取前后窗口，再合并解码；stride=None 时退化为截断。需使用fast分词器。
+    """
+
+    def __init__(self, tokenizer, model, label_map=None, batch_size=16, max_length=512, stride=128,
+                 num_threads=None, cache_size=10000):
+        self.tokenizer = tokenizer
+        self.model = model.eval()
+        self.label_map = label_map or model.config.id2label
+        self._label_tables = build_label_tables(self.label_map)
+        self.batch_size = batch_size  # 每批推理的窗口数（单个文本的窗口数超过时，该文本独占一批）
+        self.max_length = max_length
+        self.stride = stride
+        self.cache_size = cache_size  # 0 表示不缓存
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if num_threads:
+            # 进程级设置，影响本进程内所有PyTorch算子
+            torch.set_num_threads(num_threads)
+
+    @classmethod
+    def from_pretrained(cls, model_path, **kwargs):
+        """从本地目录加载分词器与模型"""
+        from transformers import AutoModelForTokenClassification, AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+        model = AutoModelForTokenClassification.from_pretrained(model_path, local_files_only=True)
+        return cls(tokenizer, model, **kwargs)
+
+    @staticmethod
+    def _cache_key(text):
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _cache_get(self, key):
+        entities = self._cache.get(key)
+        if entities is not None:
+            self._cache.move_to_end(key)
+        return entities
+
+    def _cache_put(self, key, entities):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = entities
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _encode(self, texts):
+        """分词（不padding），返回编码结果与每个文本对应的窗口下标列表"""
+        kwargs = {"truncation": True, "max_length": self.max_length,
+                  "return_special_tokens_mask": True, "return_offsets_mapping": True}
+        if self.stride is not None:
+            kwargs.update(return_overflowing_tokens=True, stride=self.stride)
+        encoding = self.tokenizer(texts, **kwargs)
+        doc_windows = [[] for _ in texts]
+        for window, doc in enumerate(encoding.get("overflow_to_sample_mapping", range(len(texts)))):
+            doc_windows[doc].append(window)
+        return encoding, doc_windows
+
+    def _pack(self, order, doc_windows):
+        """按文本顺序装批：每批不超过batch_size个窗口，同一文本的窗口不拆到两批"""
+        batch, size = [], 0
+        for doc in order:
+            n = len(doc_windows[doc])
+            if batch and size + n > self.batch_size:
+                yield batch
+                batch, size = [], 0
+            batch.append(doc)
+            size += n
+        if batch:
+            yield batch
+
+    def _merge_windows(self, windows):
+        """合并同一文本各窗口的正文token下标：相邻窗口重叠stride个token，前半取前一窗口、后半取后一窗口"""
+        if len(windows) == 1:
+            return windows
+        head = self.stride // 2
+        tail = self.stride - head
+        last = len(windows) - 1
+        return [keep[(head if i > 0 else 0):(len(keep) - tail if i < last else len(keep))]
+                for i, keep in enumerate(windows)]
+
+    def _predict(self, texts):
+        """对一组（已去重、未命中缓存的）文本推理；按长度排序使同批窗口长度接近，减少padding"""
+        encoding, doc_windows = self._encode(texts)
+        input_ids = encoding["input_ids"]
+        results = [None] * len(texts)
+        order = sorted(range(len(texts)), key=lambda d: sum(len(input_ids[w]) for w in doc_windows[d]))
+        for docs in self._pack(order, doc_windows):
+            rows = [w for d in docs for w in doc_windows[d]]
+            # 只补齐到本批最长窗口
+            inputs = self.tokenizer.pad(
+                [{name: encoding[name][w] for name in self.tokenizer.model_input_names if name in encoding}
+                 for w in rows], return_tensors="pt")
+            with torch.inference_mode():
+                logits = self.model(**inputs).logits
+            predictions = logits.argmax(dim=-1).numpy()
+
+            # 把本批各文本的正文token（去掉[CLS]/[SEP]，合并窗口重叠区）首尾相接，整批一次解码
+            label_ids, offsets, doc_ids = [], [], []
+            row = 0
+            for d in docs:
+                windows = [np.flatnonzero(np.asarray(encoding["special_tokens_mask"][w]) == 0)
+                           for w in doc_windows[d]]
+                for w, keep in zip(doc_windows[d], self._merge_windows(windows)):
+                    label_ids.append(predictions[row, keep])
+                    offsets.append(np.asarray(encoding["offset_mapping"][w], dtype=np.int64).reshape(-1, 2)[keep])
+                    doc_ids.append(np.full(len(keep), d))
+                    row += 1
+                results[d] = []
+            spans = decode_bio_spans(np.concatenate(label_ids), np.concatenate(offsets),
+                                     np.concatenate(doc_ids), self._label_tables)
+
+            types = self._label_tables[3]
+            for d, label, start, end in zip(*(a.tolist() for a in spans)):
+                results[d].append(Entity(texts[d][start:end], types[label], start, end))
+        return results
+
+    def extract_batch(self, texts):
+        """批量提取实体：texts 为文本列表或迭代器，返回 [[Entity(实体, 类型, 起始, 结束), ...], ...]"""
+        texts = list(texts)
+        keys = [self._cache_key(text) for text in texts]
+        found = {}
+        pending = {}  # 缓存键 → 待推理文本（同一批内重复的文本只推理一次）
+        for key, text in zip(keys, texts):
+            if key in found or key in pending:
+                continue
+            entities = self._cache_get(key)
+            if entities is None:
+                pending[key] = text
+            else:
+                found[key] = entities
+        self.hits += len(texts) - len(pending)
+        self.misses += len(pending)
+
+        if pending:
+            for key, entities in zip(pending, self._predict(list(pending.values()))):
+                found[key] = entities
+                self._cache_put(key, entities)
+        return [list(found[key]) for key in keys]
+
+    def iter_extract(self, texts, chunk_size=1024):
+        """流式版本：每攒够chunk_size条文本批量推理一次，按输入顺序逐条产出结果"""
+        chunk = []
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) >= chunk_size:
+                yield from self.extract_batch(chunk)
+                chunk = []
+        if chunk:
+            yield from self.extract_batch(chunk)
+
+    def extract(self, text):
+        """单条文本提取实体"""
+        return self.extract_batch([text])[0]
+
+
+def benchmark(engine, texts, batch_sizes=(1, 2, 4, 8, 16, 32, 64)):
+    """不同batch_size下的吞吐量（texts/sec），测试时关闭缓存"""
+    cache_size = engine.cache_size
+    engine.cache_size = 0
+    results = {}
+    try:
+        for batch_size in batch_sizes:
+            engine.batch_size = batch_size
+            engine._cache.clear()
+            start = time.perf_counter()
+            engine.extract_batch(texts)
+            elapsed = time.perf_counter() - start
+            results[batch_size] = len(texts) / elapsed if elapsed > 0 else 0.0
+            print(f"batch_size={batch_size:>2}：{results[batch_size]:.1f} texts/sec")
+    finally:
+        engine.cache_size = cache_size
+    return results
+
+
+# 吞吐量基准：python NEREngine.py [模型目录]
+if __name__ == "__main__":
+    import random
+    import sys
+
+    MODEL_PATH = sys.argv[1] if len(sys.argv) > 1 else "./models/bert-base-chinese-ner"
+    SAMPLES = [
+        "马云于1999年创立阿里巴巴，公司总部位于杭州余杭区。",
+        "马化腾1998年创立腾讯，总部位于深圳南山区",
+        "华为技术有限公司成立于1987年，总部位于广东省深圳市龙岗区。",
+        "张勇曾任阿里巴巴集团董事局主席兼首席执行官。",
+        "苹果公司在美国加利福尼亚州库比蒂诺发布了新款iPhone。",
+    ]
+    random.seed(0)
+    # 拼接样例得到长短不一的文本，模拟真实语料的长度分布
+    corpus = ["".join(random.choices(SAMPLES, k=random.randint(1, 6))) for _ in range(512)]
+
+    engine = NEREngine.from_pretrained(MODEL_PATH, num_threads=torch.get_num_threads())
+    print(f"=== NER吞吐量（{len(corpus)}条文本，{torch.get_num_threads()}个线程）===")
+    benchmark(engine, corpus)
+
+    # 缓存效果：第二次处理同一语料时全部命中缓存
+    engine.extract_batch(corpus)
+    start = time.perf_counter()
+    engine.extract_batch(corpus)
+    elapsed = time.perf_counter() - start
+    print(f"缓存命中：{len(corpus) / elapsed:.0f} texts/sec（hits={engine.hits}，misses={engine.misses}）")
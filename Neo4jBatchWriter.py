@@ -0,0 +1,31 @@
+import time
+from itertools import islice
+
+
+def iter_batches(rows, batch_size):
+    """将行流切分为固定大小的列表"""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _write_batch(tx, query, rows):
+    tx.run(query, rows=rows).consume()
+
+
+def write_batches(driver, query, rows, batch_size=1000, database=None):
+    """将行流按batch_size分批，每批一次 UNWIND $rows 写入并单独提交；返回写入统计"""
+    count = 0
+    batches = 0
+    start = time.perf_counter()
+    with driver.session(database=database) as session:
+        for batch in iter_batches(rows, batch_size):
+            session.execute_write(_write_batch, query, batch)
+            count += len(batch)
+            batches += 1
+    elapsed = time.perf_counter() - start
+    return {"rows": count, "batches": batches, "seconds": elapsed,
+            "rows_per_sec": count / elapsed if elapsed > 0 else 0.0}
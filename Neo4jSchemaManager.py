@@ -0,0 +1,58 @@
+import re
+
+from neo4j.exceptions import ClientError
+
+
+def merge_keys_for_triples(triples, key="name"):
+    """从 (实体1, 关系, 实体2, 实体1类型, 实体2类型) 三元组中找出即将MERGE的 (Label, 属性) 组合"""
+    pairs = set()
+    for _, _, _, s_type, o_type in triples:
+        pairs.add((s_type, key))
+        pairs.add((o_type, key))
+    return pairs
+
+
+class Neo4jSchemaManager:
+    """MERGE前的约束自举：为每个(Label, 属性)幂等地创建唯一约束，并等待索引上线后再写入"""
+
+    def __init__(self, driver, database=None, timeout=300):
+        self.driver = driver
+        self.database = database
+        self.timeout = timeout  # 等待索引上线的超时时间（秒）
+        self._ensured = set()
+
+    @staticmethod
+    def _schema_name(label, key, suffix):
+        """约束/索引名称：只保留字母、数字、下划线及中文"""
+        name = re.sub(r'[^a-zA-Z0-9_\u4e00-\u9fa5]', '_', f"{label}_{key}")
+        return f"{name}_{suffix}"
+
+    def _create(self, session, label, key):
+        """优先创建唯一约束；已有重复数据或同属性索引时退化为普通索引"""
+        try:
+            session.run(f"""
+                CREATE CONSTRAINT `{self._schema_name(label, key, "unique")}` IF NOT EXISTS
+                FOR (n:`{label}`) REQUIRE n.`{key}` IS UNIQUE
+            """).consume()
+            print(f"唯一约束就绪：{label}.{key}")
+        except ClientError as e:
+            print(f"警告：无法为{label}.{key}创建唯一约束（{e.code}），改为创建普通索引")
+            session.run(f"""
+                CREATE INDEX `{self._schema_name(label, key, "index")}` IF NOT EXISTS
+                FOR (n:`{label}`) ON (n.`{key}`)
+            """).consume()
+
+    def ensure(self, pairs, wait=True):
+        """为尚未处理过的(Label, 属性)建立约束；wait=True 时阻塞到所有索引ONLINE"""
+        new_pairs = sorted(set(pairs) - self._ensured)
+        if not new_pairs:
+            return []
+
+        with self.driver.session(database=self.database) as session:
+            for label, key in new_pairs:
+                self._create(session, label, key)
+            if wait:
+                session.run("CALL db.awaitIndexes($timeout)", timeout=self.timeout).consume()
+
+        self._ensured.update(new_pairs)
+        return new_pairs
@@ -0,0 +1,240 @@
+import random
+import re
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from neo4j.exceptions import TransientError
+from rdflib import URIRef
+from rdflib.namespace import RDF
+
+
+def get_node_id(uri):
+    """提取URI中的唯一标识（如books/1001 → 1001）"""
+    return str(uri).split("/")[-1]
+
+
+def clean_name(uri, prefix="rel_", default="RELATIONSHIP"):
+    """清理URI名称，确保符合Neo4j命名规范"""
+    # 提取最后部分
+    name = str(uri).split("/")[-1].split("#")[-1]
+    # 移除特殊字符，只保留字母、数字和下划线
+    cleaned = re.sub(r'[^a-zA-Z0-9_]', '_', name)
+    # 如果以数字开头，添加前缀
+    if cleaned and cleaned[0].isdigit():
+        cleaned = f"{prefix}{cleaned}"
+    return cleaned or default
+
+
+class RDFBatchLoader:
+    """RDF三元组批量导入器：按(主体Label, 谓词, 客体Label)分组，以UNWIND批次写入并逐批提交"""
+
+    def __init__(self, driver, batch_size=5000, database=None, schema=None):
+        self.driver = driver
+        self.batch_size = batch_size
+        self.database = database
+        self.schema = schema  # Neo4jSchemaManager，非None时在首次写入某Label前为其 id 建立唯一约束
+        self._name_cache = {}
+
+    def _clean_predicate(self, predicate):
+        """谓词名称清理结果缓存，避免对同一谓词重复做正则处理"""
+        name = self._name_cache.get(predicate)
+        if name is None:
+            name = self._name_cache[predicate] = clean_name(predicate)
+        return name
+
+    def _to_row(self, s, p, o, label_of):
+        """将单条三元组映射为(分组键, 行参数)"""
+        s_label = label_of(s)
+        if p == RDF.type:
+            # rdf:type 已体现为节点Label，只需保证节点存在
+            return ("node", s_label), {"id": get_node_id(s), "uri": str(s)}
+        p_name = self._clean_predicate(p)
+        if isinstance(o, URIRef):
+            row = {"s_id": get_node_id(s), "s_uri": str(s),
+                   "o_id": get_node_id(o), "o_uri": str(o), "uri": str(p)}
+            return ("rel", s_label, p_name, label_of(o)), row
+        return ("prop", s_label, p_name), {"id": get_node_id(s), "uri": str(s), "value": str(o)}
+
+    @staticmethod
+    def _build_query(key, match_endpoints=False):
+        """根据分组键生成UNWIND语句（Label/关系类型无法参数化，按分组拼接）"""
+        kind = key[0]
+        if kind == "rel" and match_endpoints:
+            # 并行模式下节点已在第一阶段创建，关系阶段只MATCH端点，不再争抢节点创建锁
+            _, s_label, rel_type, o_label = key
+            return f"""
+                UNWIND $rows AS row
+                MATCH (n:`{s_label}` {{id: row.s_id}})
+                MATCH (m:`{o_label}` {{id: row.o_id}})
+                MERGE (n)-[r:`{rel_type}`]->(m)
+                SET r.uri = row.uri
+            """
+        if kind == "node":
+            return f"""
+                UNWIND $rows AS row
+                MERGE (n:`{key[1]}` {{id: row.id}})
+                SET n.uri = row.uri
+            """
+        if kind == "rel":
+            _, s_label, rel_type, o_label = key
+            return f"""
+                UNWIND $rows AS row
+                MERGE (n:`{s_label}` {{id: row.s_id}})
+                  ON CREATE SET n.uri = row.s_uri
+                MERGE (m:`{o_label}` {{id: row.o_id}})
+                  ON CREATE SET m.uri = row.o_uri
+                MERGE (n)-[r:`{rel_type}`]->(m)
+                SET r.uri = row.uri
+            """
+        _, s_label, prop_name = key
+        return f"""
+            UNWIND $rows AS row
+            MERGE (n:`{s_label}` {{id: row.id}})
+              ON CREATE SET n.uri = row.uri
+            SET n.`{prop_name}` = row.value
+        """
+
+    @staticmethod
+    def _write_batch(tx, query, rows):
+        tx.run(query, rows=rows).consume()
+
+    @staticmethod
+    def _labels_of(key):
+        """分组键涉及的节点Label"""
+        return (key[1], key[3]) if key[0] == "rel" else (key[1],)
+
+    def _flush(self, session, key, rows, match_endpoints=False, retries=0):
+        """一个批次对应一个事务；retries > 0 时，驱动自身的重试耗尽后仍为TransientError（死锁、锁等待超时）的批次
+        按指数退避（加随机抖动）再整体重试至多retries次"""
+        if self.schema is not None:
+            self.schema.ensure((label, "id") for label in self._labels_of(key))
+        query = self._build_query(key, match_endpoints)
+        for attempt in range(retries + 1):
+            try:
+                session.execute_write(self._write_batch, query, rows)
+                return
+            except TransientError:
+                if attempt == retries:
+                    raise
+                time.sleep(0.1 * 2 ** attempt * (1 + random.random()))
+
+    def load(self, triples, label_of, predicate_names=None):
+        """批量导入三元组，label_of(uri) 返回节点Label；predicate_names 为预先清理好的谓词名称；返回导入统计"""
+        return self.load_chunks([triples], label_of, predicate_names)
+
+    def load_chunks(self, chunks, label_of, predicate_names=None):
+        """按块导入三元组流：每块结束时提交该块剩余数据，内存占用上限为一个块"""
+        if predicate_names:
+            self._name_cache.update(predicate_names)
+        count = 0
+        batches = 0
+        start = time.perf_counter()
+
+        with self.driver.session(database=self.database) as session:
+            for chunk in chunks:
+                buffers = defaultdict(list)
+                for s, p, o in chunk:
+                    count += 1
+                    key, row = self._to_row(s, p, o, label_of)
+                    buf = buffers[key]
+                    buf.append(row)
+                    # 某一分组攒满一个批次即提交，内存占用与批次大小成正比
+                    if len(buf) >= self.batch_size:
+                        self._flush(session, key, buf)
+                        buffers[key] = []
+                        batches += 1
+
+                # 提交剩余不足一个批次的数据
+                for key, rows in buffers.items():
+                    if rows:
+                        self._flush(session, key, rows)
+                        batches += 1
+
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else 0.0
+        print(f"批量导入完成：{count}条三元组，{batches}个批次，耗时{elapsed:.2f}秒，{rate:.0f} triples/sec")
+        return {"triples": count, "batches": batches, "seconds": elapsed, "triples_per_sec": rate}
+
+    @staticmethod
+    def _partition_of(label, node_id, workers):
+        """按 (Label, id) 的稳定哈希确定分区，保证同一节点始终落在同一个worker"""
+        return zlib.crc32(f"{label}|{node_id}".encode("utf-8")) % workers
+
+    def _run_partition(self, worker_id, phase, groups, match_endpoints, retries):
+        """单个worker：独占一个session，顺序提交本分区的全部批次"""
+        rows_done = 0
+        batches = 0
+        start = time.perf_counter()
+        with self.driver.session(database=self.database) as session:
+            for key, rows in groups.items():
+                for i in range(0, len(rows), self.batch_size):
+                    self._flush(session, key, rows[i:i + self.batch_size], match_endpoints, retries)
+                    rows_done += len(rows[i:i + self.batch_size])
+                    batches += 1
+        elapsed = time.perf_counter() - start
+        rate = rows_done / elapsed if elapsed > 0 else 0.0
+        print(f"[{phase}] worker-{worker_id}：{rows_done}行，{batches}个批次，耗时{elapsed:.2f}秒，{rate:.0f} rows/sec")
+        return rows_done, batches
+
+    def _run_phase(self, phase, partitions, match_endpoints=False, retries=0):
+        """所有分区并发执行，返回该阶段写入的总行数与批次数"""
+        with ThreadPoolExecutor(max_workers=len(partitions)) as pool:
+            futures = [pool.submit(self._run_partition, i, phase, groups, match_endpoints, retries)
+                       for i, groups in enumerate(partitions)]
+            results = [f.result() for f in futures]
+        return sum(r[0] for r in results), sum(r[1] for r in results)
+
+    def load_parallel(self, triples, label_of, workers=4, predicate_names=None, rel_retries=5):
+        """并行导入：节点/属性按(Label, id)哈希分区；全部节点完成后，关系按起点哈希分区
+
+        节点按(Label, id)分区后并发批次之间不会锁同一个节点。关系按起点分区只保证起点不冲突：
+        MERGE (s)-[r]->(o) 同时锁定终点，多个worker写到同一个热门客体时仍会锁等待甚至死锁，
+        这类TransientError由驱动重试，仍失败的批次再按指数退避重试至多rel_retries次（MERGE幂等，重试不会重复写入）。
+        """
+        if predicate_names:
+            self._name_cache.update(predicate_names)
+        node_parts = [defaultdict(list) for _ in range(workers)]
+        rel_parts = [defaultdict(list) for _ in range(workers)]
+        seen_nodes = set()
+        count = 0
+        start = time.perf_counter()
+
+        def add_node(label, uri):
+            node_id = get_node_id(uri)
+            if (label, node_id) not in seen_nodes:
+                seen_nodes.add((label, node_id))
+                part = self._partition_of(label, node_id, workers)
+                node_parts[part][("node", label)].append({"id": node_id, "uri": str(uri)})
+
+        for s, p, o in triples:
+            count += 1
+            key, row = self._to_row(s, p, o, label_of)
+            s_label = key[1]
+            add_node(s_label, s)
+            if key[0] == "rel":
+                add_node(key[3], o)
+                part = self._partition_of(s_label, row["s_id"], workers)
+                rel_parts[part][key].append(row)
+            elif key[0] == "prop":
+                # 属性与节点同分区，由同一个worker写入
+                part = self._partition_of(s_label, row["id"], workers)
+                node_parts[part][key].append(row)
+
+        # 写入前一次性建立全部约束，worker线程中不再触发schema操作
+        if self.schema is not None:
+            self.schema.ensure((label, "id") for groups in node_parts for key in groups
+                               for label in self._labels_of(key))
+
+        # 第一阶段：节点与属性；第二阶段须等待第一阶段全部完成后开始
+        node_rows, node_batches = self._run_phase("节点", node_parts)
+        rel_rows, rel_batches = self._run_phase("关系", rel_parts, match_endpoints=True, retries=rel_retries)
+
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else 0.0
+        batches = node_batches + rel_batches
+        print(f"并行导入完成：{count}条三元组，{workers}个worker，{batches}个批次，"
+              f"耗时{elapsed:.2f}秒，{rate:.0f} triples/sec")
+        return {"triples": count, "batches": batches, "node_rows": node_rows, "rel_rows": rel_rows,
+                "workers": workers, "seconds": elapsed, "triples_per_sec": rate}
@@ -0,0 +1,148 @@
+import gzip
+import os
+import re
+import sqlite3
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import RDF
+
+# N-Triples / N-Quads 词法：IRI、空白节点、字面量（可带语言标签或数据类型）
+_TERM_RE = re.compile(
+    r'\s*(?:<([^>]*)>'
+    r'|_:([A-Za-z0-9_\-]+(?:\.[A-Za-z0-9_\-]+)*)'
+    r'|"((?:[^"\\]|\\.)*)"(?:@([A-Za-z0-9\-]+)|\^\^<([^>]*)>)?)'
+)
+_ESCAPE_RE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+_ESCAPE_CHARS = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+_LITERAL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def open_text(path, mode="rt"):
+    """打开文本文件，.gz 结尾时透明地按gzip读写"""
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def open_scratch_db(path, schema):
+    """新建（已存在时清空）一个磁盘上的SQLite临时库：只作中间状态，关闭日志与同步，数据量超过页缓存时自动落盘
+
+    用SQLite而不用dbm：缺少gdbm/ndbm时dbm.open退化为dbm.dumb，其键索引整体保存在内存dict中，内存并不受限。
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+    db.executescript(schema)
+    return db
+
+
+def _unescape(value):
+    """还原N-Triples中的转义字符（\\n、\\"、\\uXXXX 等）"""
+    if "\\" not in value:
+        return value
+
+    def repl(m):
+        code = m.group(1) or m.group(2)
+        if code:
+            return chr(int(code, 16))
+        return _ESCAPE_CHARS.get(m.group(3), m.group(3))
+
+    return _ESCAPE_RE.sub(repl, value)
+
+
+def parse_line(line):
+    """解析一行N-Triples/N-Quads，返回(s, p, o)；空行或注释返回None（N-Quads的图名被忽略）"""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    terms = []
+    pos = 0
+    while len(terms) < 4:
+        m = _TERM_RE.match(line, pos)
+        if m is None:
+            break
+        iri, bnode, lexical, lang, datatype = m.groups()
+        if iri is not None:
+            terms.append(URIRef(_unescape(iri)))
+        elif bnode is not None:
+            terms.append(BNode(bnode))
+        else:
+            terms.append(Literal(_unescape(lexical), lang=lang,
+                                 datatype=URIRef(datatype) if datatype else None))
+        pos = m.end()
+
+    if len(terms) < 3 or not line[pos:].strip().startswith("."):
+        raise ValueError(f"无法解析的N-Triples行：{line[:200]}")
+    return terms[0], terms[1], terms[2]
+
+
+def iter_triples(path):
+    """逐行流式读取N-Triples/N-Quads文件（支持.gz），不构建rdflib Graph"""
+    with open_text(path) as f:
+        for line in f:
+            triple = parse_line(line)
+            if triple is not None:
+                yield triple
+
+
+def iter_chunks(triples, chunk_size=100000):
+    """将三元组流切分为固定大小的块"""
+    chunk = []
+    for triple in triples:
+        chunk.append(triple)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class DiskTypeStore:
+    """基于SQLite的磁盘键值存储：保存 主体URI → Label，内存占用与数据规模无关"""
+
+    def __init__(self, path):
+        self._db = open_scratch_db(str(path), "CREATE TABLE types (uri TEXT PRIMARY KEY, label TEXT) WITHOUT ROWID")
+
+    def __len__(self):
+        return self._db.execute("SELECT count(*) FROM types").fetchone()[0]
+
+    def __contains__(self, uri):
+        return self._db.execute("SELECT 1 FROM types WHERE uri = ?", (str(uri),)).fetchone() is not None
+
+    def setdefault(self, uri, label):
+        self._db.execute("INSERT OR IGNORE INTO types VALUES (?, ?)", (str(uri), label))
+
+    def get(self, uri, default=None):
+        row = self._db.execute("SELECT label FROM types WHERE uri = ?", (str(uri),)).fetchone()
+        return row[0] if row is not None else default
+
+    def close(self):
+        self._db.close()
+
+
+def build_type_map(path, type_to_label, store=None):
+    """第一遍扫描：只收集rdf:type，构建 主体URI → Label 映射（store为None时使用内存dict）"""
+    store = {} if store is None else store
+    for s, p, o in iter_triples(path):
+        if p == RDF.type:
+            # 多个类型时取第一个
+            store.setdefault(s, type_to_label(o))
+    return store
+
+
+def format_iri(iri):
+    """IRI → N-Triples/Turtle 写法"""
+    return f"<{iri}>"
+
+
+def format_literal(lexical, datatype=None, lang=None):
+    """字面量 → N-Triples/Turtle 写法（转义引号、反斜杠与换行）"""
+    text = f'"{str(lexical).translate(_LITERAL_ESCAPES)}"'
+    if lang:
+        return f"{text}@{lang}"
+    if datatype:
+        return f"{text}^^<{datatype}>"
+    return text
@@ -0,0 +1,255 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+import traceback
+from itertools import islice
+
+_DONE = "done"
+_ERROR = "error"
+_TRIPLES = "triples"
+
+
+class StageStats:
+    """单个阶段的处理量与忙碌时间"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+
+    def add(self, items, seconds):
+        self.items += items
+        self.busy += seconds
+
+
+class QueueDepth:
+    """队列深度采样（mp.Queue在macOS上不支持qsize，此时不统计）"""
+
+    def __init__(self, name, q, capacity):
+        self.name = name
+        self.q = q
+        self.capacity = capacity
+        self.samples = 0
+        self.total = 0
+        self.max = 0
+
+    def sample(self):
+        try:
+            depth = self.q.qsize()
+        except NotImplementedError:
+            return
+        self.samples += 1
+        self.total += depth
+        self.max = max(self.max, depth)
+
+
+def _put(q, item, stop):
+    """阻塞写入有界队列（下游变慢时上游在此等待，即背压），stop置位后放弃"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.2)
+        except queue.Empty:
+            continue
+    return None
+
+
+def _extract_worker(extract, initializer, initargs, task_q, result_q):
+    """抽取worker进程：初始化（如加载模型）一次，之后循环处理文本批次，直到收到结束标记"""
+    items = 0
+    busy = 0.0
+    try:
+        if initializer is not None:
+            initializer(*initargs)
+        while True:
+            texts = task_q.get()
+            if texts is None:
+                break
+            start = time.perf_counter()
+            triples = extract(texts)
+            busy += time.perf_counter() - start
+            items += len(texts)
+            result_q.put((_TRIPLES, triples))
+        result_q.put((_DONE, items, busy))
+    except Exception:
+        result_q.put((_ERROR, traceback.format_exc()))
+
+
+class TextPipeline:
+    """文本 → 三元组 → Neo4j 的多进程流水线
+
+    读取（主进程线程）→ 抽取（workers个进程，各自加载一次模型）→ 对齐（主进程线程）→ 批量写入（主进程线程），
+    阶段之间用有界队列连接：写入变慢时队列依次写满，对齐、抽取、读取随之阻塞，内存占用不随语料增长。
+
+    extract(texts) -> 三元组列表：在worker进程中执行，须为模块级函数（可pickle）；
+    align(triples) -> 三元组列表：在主进程中串行执行，可维护跨批次的对齐状态；
+    write(triples)：每攒够write_batch_size条三元组调用一次。
+    """
+
+    def __init__(self, extract, align, write, workers=2, batch_size=64, queue_size=8,
+                 write_batch_size=1000, initializer=None, initargs=(), monitor_interval=0.1):
+        self.extract = extract
+        self.align = align
+        self.write = write
+        self.workers = workers
+        self.batch_size = batch_size  # 每个抽取任务包含的文本数
+        self.queue_size = queue_size  # 每个队列最多缓冲的批次数
+        self.write_batch_size = write_batch_size
+        self.initializer = initializer
+        self.initargs = initargs
+        self.monitor_interval = monitor_interval
+        self.stages = {}
+        self.queues = []
+        self.elapsed = 0.0
+
+    def run(self, texts, triples=()):
+        """执行流水线：texts 为文本迭代器；triples 为已构建好的三元组（如结构化数据），直接进入对齐阶段"""
+        stop = threading.Event()
+        errors = []
+        task_q = mp.Queue(self.queue_size)
+        result_q = mp.Queue(self.queue_size)
+        write_q = queue.Queue(self.queue_size)
+        self.stages = {name: StageStats(name) for name in ("读取", "抽取", "对齐", "写入")}
+        self.queues = [QueueDepth("读取→抽取", task_q, self.queue_size),
+                       QueueDepth("抽取→对齐", result_q, self.queue_size),
+                       QueueDepth("对齐→写入", write_q, self.queue_size)]
+
+        def guarded(target):
+            def run():
+                try:
+                    target()
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+            return run
+
+        def read():
+            stats = self.stages["读取"]
+            batch = []
+            start = time.perf_counter()
+            for text in texts:
+                batch.append(text)
+                if len(batch) >= self.batch_size:
+                    stats.add(len(batch), time.perf_counter() - start)
+                    if not _put(task_q, batch, stop):
+                        return
+                    batch = []
+                    start = time.perf_counter()
+            if batch:
+                stats.add(len(batch), time.perf_counter() - start)
+                _put(task_q, batch, stop)
+            for _ in range(self.workers):
+                _put(task_q, None, stop)
+
+        def align():
+            stats = self.stages["对齐"]
+
+            def forward(batch):
+                start = time.perf_counter()
+                aligned = self.align(batch)
+                stats.add(len(batch), time.perf_counter() - start)
+                return _put(write_q, aligned, stop)
+
+            seed = iter(triples)
+            for batch in iter(lambda: list(islice(seed, self.write_batch_size)), []):
+                if not forward(batch):
+                    return
+            finished = 0
+            while finished < self.workers:
+                # worker被强制终止（OOM、段错误）时不会发送结束或异常标记，等待消息时同时检查进程状态
+                exited = all(process.exitcode is not None for process in processes)
+                try:
+                    message = result_q.get(timeout=0.2)
+                except queue.Empty:
+                    if stop.is_set():
+                        return
+                    crashed = [process for process in processes if process.exitcode not in (None, 0)]
+                    if crashed:
+                        raise RuntimeError("抽取worker进程异常退出：" + "，".join(
+                            f"pid {process.pid} exitcode {process.exitcode}" for process in crashed))
+                    if exited:
+                        raise RuntimeError(f"抽取worker进程均已退出，只收到{finished}/{self.workers}个结束标记")
+                    continue
+                if message[0] == _ERROR:
+                    raise RuntimeError(f"抽取worker异常：\n{message[1]}")
+                if message[0] == _DONE:
+                    self.stages["抽取"].add(message[1], message[2])
+                    finished += 1
+                elif not forward(message[1]):
+                    return
+            _put(write_q, None, stop)
+
+        def write():
+            stats = self.stages["写入"]
+            pending = []
+            while True:
+                batch = _get(write_q, stop)
+                if stop.is_set():
+                    return
+                if batch is not None:
+                    pending.extend(batch)
+                while pending and (batch is None or len(pending) >= self.write_batch_size):
+                    rows, pending = pending[:self.write_batch_size], pending[self.write_batch_size:]
+                    start = time.perf_counter()
+                    self.write(rows)
+                    stats.add(len(rows), time.perf_counter() - start)
+                if batch is None:
+                    return
+
+        def monitor():
+            while not done.wait(self.monitor_interval):
+                for depth in self.queues:
+                    depth.sample()
+
+        start = time.perf_counter()
+        processes = [mp.Process(target=_extract_worker, daemon=True,
+                                args=(self.extract, self.initializer, self.initargs, task_q, result_q))
+                     for _ in range(self.workers)]
+        for process in processes:
+            process.start()
+        done = threading.Event()
+        threads = [threading.Thread(target=guarded(target), daemon=True) for target in (read, align, write)]
+        threads.append(threading.Thread(target=monitor, daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads[:3]:
+                thread.join()
+        finally:
+            done.set()
+            if errors:
+                for process in processes:
+                    process.terminate()
+            for process in processes:
+                process.join()
+        self.elapsed = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+        return self.report()
+
+    def report(self):
+        """打印并返回各阶段吞吐量（按忙碌时间计）与队列深度"""
+        result = {"elapsed": self.elapsed, "stages": {}, "queues": {}}
+        print(f"=== 流水线统计（总耗时{self.elapsed:.2f}秒，{self.workers}个抽取进程）===")
+        for stats in self.stages.values():
+            rate = stats.items / stats.busy if stats.busy > 0 else 0.0
+            result["stages"][stats.name] = {"items": stats.items, "busy": stats.busy, "items_per_sec": rate}
+            print(f"{stats.name}：{stats.items}条，忙碌{stats.busy:.2f}秒，{rate:.1f}条/秒")
+        texts = self.stages["读取"].items
+        result["texts_per_sec"] = texts / self.elapsed if self.elapsed > 0 else 0.0
+        print(f"端到端：{texts}条文本，{result['texts_per_sec']:.1f}条/秒（抽取阶段的忙碌时间为各进程之和）")
+        for depth in self.queues:
+            mean = depth.total / depth.samples if depth.samples else 0.0
+            result["queues"][depth.name] = {"mean": mean, "max": depth.max, "capacity": depth.capacity}
+            print(f"队列{depth.name}：平均深度{mean:.1f}，最大{depth.max}/{depth.capacity}")
+        return result